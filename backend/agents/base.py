@@ -1,10 +1,125 @@
 # agents/base.py - Base agent abstract class
 
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Callable, Dict, Any, Optional, List, Tuple, Union
+from agents import cache as response_cache
+from agents.batch import submit_batch
+from agents.openai_client import create_chat_completion, get_client, stream_chat_completion
 from conversation_models import ConversationResponse, DatabaseChanges, AgentTransition, ContextUpdates, AgentType
 
 
+# Agent command patterns, compiled once at import instead of on every response
+_PERSONA_CONFIRMED_RE = re.compile(r'PERSONA_CONFIRMED:\s*([^|]+)\|\s*([^\n]+)', re.IGNORECASE)
+_REFINED_NORTHSTAR_RE = re.compile(r'REFINED_NORTHSTAR:\s*([^\n]+)', re.IGNORECASE)
+_GOAL_CREATED_RE = re.compile(r'GOAL_CREATED:\s*([^|]+)\|\s*([^|]+)\|\s*([^\n]+)', re.IGNORECASE)
+_TRANSITION_GOALS_RE = re.compile(r'TRANSITION_TO_GOALS:\s*([^\n]+)', re.IGNORECASE)
+_TRANSITION_DISCOVERY_RE = re.compile(r'TRANSITION_TO_DISCOVERY', re.IGNORECASE)
+_TRANSITION_REFINEMENT_RE = re.compile(r'TRANSITION_TO_REFINEMENT:\s*([^\n]+)', re.IGNORECASE)
+
+# Every command line the user shouldn't see, removed in a single pass
+# (including its trailing newline)
+_CLEAN_RE = re.compile(
+    r'(?:PERSONA_CONFIRMED:\s*[^|]+\|[^\n]+'
+    r'|REFINED_NORTHSTAR:\s*[^\n]+'
+    r'|VARIANT_PERSONA:\s*[^|]+\|[^\n]+'
+    r'|GOAL_CREATED:\s*[^|]+\|[^\n]+'
+    r'|TRANSITION_TO_[A-Z]+:\s*[^\n]+)\n?',
+    re.IGNORECASE
+)
+
+# Separator after a command's colon: spaces, optionally one line break, as long as the
+# next line isn't itself a command (so "REFINED_NORTHSTAR:" left empty can't swallow
+# the command that follows it)
+_COMMAND_SEP = (
+    r'[ \t]*(?:\n[ \t]*)?'
+    r'(?!PERSONA_CONFIRMED|REFINED_NORTHSTAR|VARIANT_PERSONA|GOAL_CREATED|TRANSITION_TO_)'
+)
+
+# All commands in one alternation for the single-pass parser. The outer named
+# group of each branch identifies the command kind via match.lastgroup; the
+# branches mirror the extract/clean patterns above, except that fields stay on one
+# line ([ \t]* after pipes, [^|\n]+ for fields) and the value may only start on the
+# next line through _COMMAND_SEP, so a malformed command can't swallow the valid
+# command on the next line.
+_COMMAND_RE = re.compile(
+    r'(?P<persona>PERSONA_CONFIRMED:' + _COMMAND_SEP + r'(?P<persona_name>[^|\n]+)\|[ \t]*(?P<persona_north_star>[^\n]+)\n?)'
+    r'|(?P<refined>REFINED_NORTHSTAR:' + _COMMAND_SEP + r'(?P<refined_north_star>[^\n]+)\n?)'
+    r'|(?P<variant>VARIANT_PERSONA:' + _COMMAND_SEP + r'[^|\n]+\|[^\n]+\n?)'
+    r'|(?P<goal>GOAL_CREATED:' + _COMMAND_SEP + r'(?P<goal_name>[^|\n]+)\|[ \t]*(?P<goal_criteria>[^|\n]+)\|[ \t]*(?P<goal_review_date>[^\n]+)\n?)'
+    r'|(?P<goal_partial>GOAL_CREATED:' + _COMMAND_SEP + r'[^|\n]+\|[^\n]+\n?)'
+    r'|(?P<transition>TRANSITION_TO_(?P<transition_target>[A-Z]+):' + _COMMAND_SEP + r'(?P<transition_arg>[^\n]+)\n?)'
+    r'|(?P<bare_discovery>TRANSITION_TO_DISCOVERY)',
+    re.IGNORECASE
+)
+
+# Literal command prefixes; a response containing none of them is plain prose
+_COMMAND_TOKENS = ("PERSONA_CONFIRMED", "REFINED_NORTHSTAR", "VARIANT_PERSONA", "GOAL_CREATED", "TRANSITION_TO_")
+
+# Model for conversational replies (the same as the frontend), and a smaller
+# one for internal bookkeeping such as history summaries
+MODEL_FOR_GEN = "gpt-4o-mini"
+MODEL_FOR_SUMMARY = "gpt-4.1-nano"
+
+# Messages rendered verbatim into prompts; older ones are covered by context['history_summary']
+HISTORY_WINDOW = 12
+
+# The summary of older messages is refreshed every this many messages
+HISTORY_SUMMARY_INTERVAL = 24
+
+# Frontend route for each agent type
+_ROUTE_MAP = {
+    'discovery': '/personas/discovery',
+    'refinement': '/personas/edit',
+    'goal': '/goals',
+    'management': '/dashboard',
+    'educational': '/personas'
+}
+
+# Transition message builders keyed by target agent
+_TRANSITION_MESSAGES: Dict[str, Callable[[Dict[str, str]], str]] = {
+    'goal': lambda info: f"Great! Let's set some goals for {info.get('persona_name', 'your persona')}. Moving to the goals page.",
+    'discovery': lambda info: (
+        "Perfect! Now that you understand personas, let me connect you with our Discovery Agent who will help you identify and create your personal personas."
+        if info.get('reason', '') == 'educational_handoff'
+        else "Perfect! Let's discover your personal personas. Moving to the discovery page."
+    ),
+    'refinement': lambda info: "I'll help you refine your persona. Let me take you to the editing interface."
+}
+
+
+def history_summary_due(message_count: int, summarized_at: int = 0) -> bool:
+    """
+    Check whether the history summary should be refreshed.
+    
+    Args:
+        message_count: Messages in the history now
+        summarized_at: Message count when the summary was last refreshed (0 if never)
+        
+    Returns:
+        True once HISTORY_SUMMARY_INTERVAL messages have arrived since the last refresh
+    """
+    return message_count > HISTORY_WINDOW and message_count - summarized_at >= HISTORY_SUMMARY_INTERVAL
+
+
+def normalize_history(raw: List[Dict[str, Any]]) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Split stored messages into column lists, resolving the legacy key fallbacks once.
+    
+    Messages may use 'from'/'text' or the older 'from_user'/'message' keys.
+    
+    Args:
+        raw: List of message dicts
+        
+    Returns:
+        Tuple of (froms, texts, agent_types), one entry per message
+    """
+    froms = [m.get('from') or m.get('from_user', 'unknown') for m in raw]
+    texts = [m.get('text') or m.get('message', '') for m in raw]
+    agent_types = [m.get('agent_type', 'unknown') for m in raw]
+    return froms, texts, agent_types
+
+
 class BaseAgent(ABC):
     """
     Abstract base class for all conversation agents.
@@ -17,6 +132,18 @@ class BaseAgent(ABC):
     - ManagementAgent: Overview and management of personas/goals
     """
     
+    # Generation settings; agents with short replies lower max_tokens
+    model: str = MODEL_FOR_GEN
+    temperature: float = 0.7
+    max_tokens: int = 1000
+    
+    # OpenAI response_format for agents that use structured output (None = free text)
+    response_format: Optional[Dict[str, Any]] = None
+    
+    # Whether prompts read other conversations in the session (session_history); agents
+    # that only use the current conversation let a forced request skip the session query
+    needs_session_history: bool = True
+    
     def __init__(self):
         """Initialize the agent"""
         pass
@@ -51,8 +178,85 @@ class BaseAgent(ABC):
         """
         pass
     
-    @abstractmethod
-    def process_ai_response(self, ai_response: str, context: Dict[str, Any]) -> ConversationResponse:
+    def build_prompt(self, context: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """
+        Return (system_prompt, context_message) for a request.
+        
+        Default is the full generate_system_prompt with no separate context
+        message; agents with a static prompt prefix return the prefix and send
+        the per-request context as its own message.
+        """
+        return self.generate_system_prompt(context), None
+    
+    def build_messages(self, user_message: str, context: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Build the chat messages sent to OpenAI for a user message"""
+        system_prompt, context_message = self.build_prompt(context)
+        return self._chat_messages(system_prompt, user_message, context_message)
+    
+    def join_context_sections(self, *sections: Tuple[str, str]) -> str:
+        """
+        Join (header, body) sections of a context message.
+        
+        Sections with an empty body are left out entirely, so a first turn
+        without history doesn't spend tokens on an empty header.
+        """
+        return "\n\n".join(f"{header}\n{body}" for header, body in sections if body)
+    
+    def _chat_messages(
+        self,
+        system_prompt: str,
+        user_message: str,
+        context_message: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """System prompt, optional context message, then the user's message"""
+        messages = [{"role": "system", "content": system_prompt}]
+        if context_message:
+            messages.append({"role": "system", "content": context_message})
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    async def call_openai(
+        self,
+        system_prompt: str,
+        user_message: str,
+        context_message: Optional[str] = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Call OpenAI API with system prompt and user message.
+        
+        When context_message is given it is sent as a second system message after
+        system_prompt, keeping the prompt prefix stable for OpenAI prompt caching.
+        use_cache=False bypasses the response cache.
+        """
+        cache_key = None
+        if use_cache:
+            cache_key, cached = self.get_cached_response(
+                system_prompt, user_message, context_message,
+                model=self.model, temperature=self.temperature
+            )
+            if cached is not None:
+                return cached
+        
+        client = get_client()
+        
+        request = {
+            "model": self.model,
+            "messages": self._chat_messages(system_prompt, user_message, context_message),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.response_format is not None:
+            request["response_format"] = self.response_format
+        
+        response = await create_chat_completion(client, **request)
+        
+        ai_response = response.choices[0].message.content
+        if cache_key:
+            self.cache_response(cache_key, ai_response)
+        return ai_response
+    
+    async def process_ai_response(self, ai_response: str, context: Dict[str, Any]) -> ConversationResponse:
         """
         Process the AI response and extract any actions to perform.
         
@@ -63,7 +267,158 @@ class BaseAgent(ABC):
         Returns:
             ConversationResponse with actions and context updates
         """
-        pass
+        return self.build_conversation_response(
+            conversation_id=context.get('conversation_id', 'unknown'),
+            session_id=context.get('session_id'),
+            ai_response=ai_response,
+            context=context,
+            previous_agent_type=context.get('previous_agent_type')
+        )
+    
+    def _precheck(self, context: Dict[str, Any]) -> Optional[ConversationResponse]:
+        """
+        Hook run before calling the model.
+        
+        Returns:
+            A ConversationResponse to send instead of calling OpenAI (e.g. when
+            required context is missing), or None to continue
+        """
+        return None
+    
+    async def process_message(self, user_message: str, context: Dict[str, Any]) -> ConversationResponse:
+        """
+        Main entry point for processing a user message.
+        
+        Args:
+            user_message: The user's message
+            context: Conversation context including history, IDs, etc.
+            
+        Returns:
+            ConversationResponse with AI response and any actions
+        """
+        early_response = self._precheck(context)
+        if early_response is not None:
+            return early_response
+        
+        system_prompt, context_message = self.build_prompt(context)
+        
+        ai_response = await self.call_openai(
+            system_prompt, user_message, context_message,
+            use_cache=not context.get('no_cache')
+        )
+        
+        return await self.process_ai_response(ai_response, context)
+    
+    async def stream_openai(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, yielding content deltas as they arrive.
+        
+        Args:
+            messages: Chat messages (see build_messages)
+            
+        Yields:
+            Text fragments of the AI response
+        """
+        client = get_client()
+        # The concurrency slot is held until the stream has been read (or abandoned)
+        async with stream_chat_completion(
+            client,
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        ) as stream:
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+    
+    async def process_message_stream(
+        self,
+        user_message: str,
+        context: Dict[str, Any]
+    ) -> AsyncIterator[Union[str, ConversationResponse]]:
+        """
+        Streaming variant of process_message.
+        
+        Yields user-visible text as each line completes, then the final
+        ConversationResponse built from the full response. Command lines are
+        stripped from the streamed text (as in clean_response_for_user) and
+        still parsed into database changes and transitions at the end.
+        
+        Args:
+            user_message: The user's message
+            context: Conversation context including history, IDs, etc.
+            
+        Yields:
+            Text chunks, followed by one ConversationResponse
+        """
+        early_response = self._precheck(context)
+        if early_response is not None:
+            yield early_response.user_response
+            yield early_response
+            return
+        
+        if self.response_format is not None:
+            # Structured output isn't readable until complete - send it in one piece
+            response = await self.process_message(user_message, context)
+            yield response.user_response
+            yield response
+            return
+        
+        parts = []
+        pending = ""
+        async for delta in self.stream_openai(self.build_messages(user_message, context)):
+            parts.append(delta)
+            pending += delta
+            # Emit whole lines only, so a command is never split across chunks
+            while "\n" in pending:
+                line, pending = pending.split("\n", 1)
+                visible = self._visible_text(line + "\n")
+                if visible:
+                    yield visible
+        
+        visible = self._visible_text(pending)
+        if visible:
+            yield visible
+        
+        yield await self.process_ai_response("".join(parts), context)
+    
+    def _visible_text(self, text: str) -> str:
+        """Strip command lines from a streamed fragment"""
+        upper = text.upper()
+        if not any(token in upper for token in _COMMAND_TOKENS):
+            return text
+        return _CLEAN_RE.sub('', text)
+    
+    async def process_message_batched(self, messages: List[Dict[str, Any]]) -> str:
+        """
+        Queue messages for this agent through the OpenAI Batch API.
+        
+        For bulk/cron flows that can wait for results; interactive requests
+        should use process_message.
+        
+        Args:
+            messages: Dicts with 'custom_id', 'message' and 'context' (as for process_message)
+            
+        Returns:
+            Batch ID; collect with agents.batch.get_batch_results and pass each
+            response through process_ai_response with its context
+        """
+        requests = []
+        for item in messages:
+            body = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": self.generate_system_prompt(item['context'])},
+                    {"role": "user", "content": item['message']}
+                ],
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens
+            }
+            if self.response_format is not None:
+                body["response_format"] = self.response_format
+            requests.append({'custom_id': item['custom_id'], 'body': body})
+        return await submit_batch(requests)
     
     def can_handle_intent(self, intent: str, context: Dict[str, Any]) -> bool:
         """
@@ -89,36 +444,168 @@ class BaseAgent(ABC):
         """
         pass
     
-    def clean_response_for_user(self, ai_response: str) -> str:
+    def get_cached_response(
+        self,
+        system_prompt: str,
+        user_message: str,
+        context_message: Optional[str] = None,
+        model: str = MODEL_FOR_GEN,
+        temperature: float = 0.7
+    ) -> Tuple[str, Optional[str]]:
         """
-        Clean AI response by removing agent-specific formatting/commands.
+        Look up a previous AI response for the same request payload.
         
         Args:
-            ai_response: Raw AI response
+            system_prompt: System prompt sent to the model
+            user_message: The user's message
+            context_message: Optional per-request context sent alongside the prompt
+            model: Model the request is sent to
+            temperature: Sampling temperature of the request
             
         Returns:
-            Cleaned response suitable for user display
+            Tuple of (cache_key, cached response or None); pass the key to cache_response
+        """
+        cache_key = response_cache.make_cache_key(model, temperature, system_prompt, user_message, context_message)
+        return cache_key, response_cache.get_response(cache_key)
+    
+    def cache_response(self, cache_key: str, ai_response: str) -> None:
+        """
+        Remember an AI response for cache_key.
+        
+        Responses carrying agent commands are not cached, so a hit never replays
+        persona/goal creation or a transition.
         """
-        # Remove common agent command patterns that shouldn't be shown to user
-        cleaned = ai_response
+        if not ai_response:
+            return
+        upper = ai_response.upper()
+        if any(token in upper for token in _COMMAND_TOKENS):
+            return
         
-        # Remove persona confirmation commands
-        import re
-        cleaned = re.sub(r'PERSONA_CONFIRMED:\s*[^|]+\|[^\n]+\n?', '', cleaned, flags=re.IGNORECASE)
+        response_cache.store_response(cache_key, ai_response)
+    
+    def render_session_history(self, context: Dict[str, Any]) -> str:
+        """
+        Render the session (or conversation) history as "from (agent_type): text" lines.
         
-        # Remove refined northstar commands  
-        cleaned = re.sub(r'REFINED_NORTHSTAR:\s*[^\n]+\n?', '', cleaned, flags=re.IGNORECASE)
+        The result is cached on the context dict, keyed by history length and last
+        message id, so repeated prompt builds within a request don't re-render it.
         
-        # Remove variant persona commands
-        cleaned = re.sub(r'VARIANT_PERSONA:\s*[^|]+\|[^\n]+\n?', '', cleaned, flags=re.IGNORECASE)
+        Args:
+            context: Conversation context with session_history or conversation_history
+            
+        Returns:
+            Newline-joined history string (empty if there is no history)
+        """
+        history_source = context.get('session_history') or context.get('conversation_history') or []
+        return self._render_history_cached(
+            context, '_rendered_history', history_source,
+            lambda froms, texts, agent_types: "\n".join(map("{} ({}): {}".format, froms, agent_types, texts))
+        )
+    
+    def render_conversation_history(self, context: Dict[str, Any]) -> str:
+        """
+        Render the current conversation's history as "from: text" lines.
         
-        # Remove goal creation commands
-        cleaned = re.sub(r'GOAL_CREATED:\s*[^|]+\|[^\n]+\n?', '', cleaned, flags=re.IGNORECASE)
+        Cached on the context dict the same way as render_session_history.
         
-        # Remove transition commands
-        cleaned = re.sub(r'TRANSITION_TO_[A-Z]+:\s*[^\n]+\n?', '', cleaned, flags=re.IGNORECASE)
+        Args:
+            context: Conversation context with conversation_history
+            
+        Returns:
+            Newline-joined history string (empty if there is no history)
+        """
+        return self._render_history_cached(
+            context, '_rendered_conversation_history', context.get('conversation_history') or [],
+            lambda froms, texts, agent_types: "\n".join(map("{}: {}".format, froms, texts))
+        )
+    
+    def _render_history_cached(
+        self,
+        context: Dict[str, Any],
+        slot: str,
+        history: List[Dict[str, Any]],
+        render: Callable[[List[str], List[str], List[str]], str]
+    ) -> str:
+        """Render normalized history columns, reusing the copy cached in context[slot] if still current"""
+        if not history:
+            return ""
+        
+        last_msg = history[-1]
+        cache_key = (len(history), last_msg.get('id', id(last_msg)))
+        cached = context.get(slot)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        
+        rendered = render(*normalize_history(self._window_history(history)))
+        summary = context.get('history_summary')
+        if summary and len(history) > HISTORY_WINDOW:
+            rendered = f"Summary of earlier conversation: {summary}\n{rendered}"
+        context[slot] = (cache_key, rendered)
+        return rendered
+    
+    def _window_history(self, history: List[Dict[str, Any]], k: int = HISTORY_WINDOW) -> List[Dict[str, Any]]:
+        """Return the last k messages of history"""
+        return history[-k:]
+    
+    async def summarize_history(self, context: Dict[str, Any]) -> Optional[str]:
+        """
+        Fold messages that have left the history window into a running summary.
+        
+        Only runs when history_summary_due says so for the history length
+        (context['session_message_count'] when given) and the count at the last
+        refresh (context['history_summary_at']). The previous summary
+        (context['history_summary']) is extended with every message that dropped
+        out of the window since that refresh, so a refresh that failed is caught
+        up by the next one.
+        
+        Args:
+            context: Conversation context with session_history or conversation_history
+            
+        Returns:
+            The new summary, or None if no refresh is due
+        """
+        history = context.get('session_history') or context.get('conversation_history') or []
+        # session_history may hold only the most recent messages; count them all
+        total = context.get('session_message_count') or len(history)
+        summarized_at = context.get('history_summary_at') or 0
+        if not history_summary_due(total, summarized_at):
+            return None
+        
+        # Messages that were inside the window at the last refresh onwards, located in
+        # history by how many earlier messages it leaves out
+        start = max(summarized_at - HISTORY_WINDOW, 0) - (total - len(history))
+        older = history[max(start, 0):-HISTORY_WINDOW]
+        froms, texts, _ = normalize_history(older)
+        transcript = "\n".join(map("{}: {}".format, froms, texts))
+        previous_summary = context.get('history_summary')
+        if previous_summary:
+            transcript = f"Summary so far: {previous_summary}\n\n{transcript}"
+        
+        client = get_client()
+        response = await create_chat_completion(
+            client,
+            model=MODEL_FOR_SUMMARY,
+            messages=[
+                {"role": "system", "content": "Summarize this personal coaching conversation in one short paragraph. Keep the personas, northstars, goals and decisions the user discussed."},
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0.3,
+            max_tokens=300
+        )
+        return response.choices[0].message.content.strip()
+    
+    def clean_response_for_user(self, ai_response: str) -> str:
+        """
+        Clean AI response by removing agent-specific formatting/commands.
         
-        return cleaned.strip()
+        Args:
+            ai_response: Raw AI response
+            
+        Returns:
+            Cleaned response suitable for user display
+        """
+        # Remove persona, northstar, variant, goal and transition commands
+        return _CLEAN_RE.sub('', ai_response).strip()
     
     def extract_persona_actions(self, ai_response: str) -> list[Dict[str, Any]]:
         """
@@ -130,11 +617,10 @@ class BaseAgent(ABC):
         Returns:
             List of persona actions to perform
         """
-        import re
         actions = []
         
         # Look for PERSONA_CONFIRMED: Name | Northstar
-        persona_matches = re.findall(r'PERSONA_CONFIRMED:\s*([^|]+)\|\s*([^\n]+)', ai_response, re.IGNORECASE)
+        persona_matches = _PERSONA_CONFIRMED_RE.findall(ai_response)
         for name, northstar in persona_matches:
             actions.append({
                 'type': 'create',
@@ -142,12 +628,12 @@ class BaseAgent(ABC):
                 'north_star': northstar.strip()
             })
         
-        # Look for REFINED_NORTHSTAR: Updated northstar
-        refined_matches = re.findall(r'REFINED_NORTHSTAR:\s*([^\n]+)', ai_response, re.IGNORECASE)
-        for northstar in refined_matches:
+        # Look for REFINED_NORTHSTAR: Updated northstar (one per response - the first wins)
+        refined_match = _REFINED_NORTHSTAR_RE.search(ai_response)
+        if refined_match:
             actions.append({
                 'type': 'update_northstar',
-                'north_star': northstar.strip()
+                'north_star': refined_match.group(1).strip()
             })
             
         return actions
@@ -162,11 +648,10 @@ class BaseAgent(ABC):
         Returns:
             List of goal actions to perform
         """
-        import re 
         actions = []
         
         # Look for GOAL_CREATED: Name | Acceptance Criteria | Review Date
-        goal_matches = re.findall(r'GOAL_CREATED:\s*([^|]+)\|\s*([^|]+)\|\s*([^\n]+)', ai_response, re.IGNORECASE)
+        goal_matches = _GOAL_CREATED_RE.findall(ai_response)
         for name, criteria, review_date in goal_matches:
             actions.append({
                 'type': 'create',
@@ -187,10 +672,8 @@ class BaseAgent(ABC):
         Returns:
             Transition information if found, None otherwise
         """
-        import re
-        
         # Look for TRANSITION_TO_GOALS: persona_name
-        goals_match = re.search(r'TRANSITION_TO_GOALS:\s*([^\n]+)', ai_response, re.IGNORECASE)
+        goals_match = _TRANSITION_GOALS_RE.search(ai_response)
         if goals_match:
             return {
                 'to_agent': 'goal',
@@ -199,14 +682,14 @@ class BaseAgent(ABC):
             }
             
         # Look for TRANSITION_TO_DISCOVERY
-        if re.search(r'TRANSITION_TO_DISCOVERY', ai_response, re.IGNORECASE):
+        if _TRANSITION_DISCOVERY_RE.search(ai_response):
             return {
                 'to_agent': 'discovery',
                 'reason': 'educational_handoff'
             }
             
         # Look for TRANSITION_TO_REFINEMENT: persona_id
-        refinement_match = re.search(r'TRANSITION_TO_REFINEMENT:\s*([^\n]+)', ai_response, re.IGNORECASE)
+        refinement_match = _TRANSITION_REFINEMENT_RE.search(ai_response)
         if refinement_match:
             return {
                 'to_agent': 'refinement',
@@ -216,6 +699,94 @@ class BaseAgent(ABC):
             
         return None
     
+    def _single_pass_parse(
+        self,
+        ai_response: str
+    ) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]], Optional[Dict[str, str]]]:
+        """
+        Extract all commands and clean the response in a single regex walk.
+        
+        Equivalent to calling clean_response_for_user, extract_persona_actions,
+        extract_goal_actions and extract_transitions, but scans the response once.
+        
+        Args:
+            ai_response: Raw AI response
+            
+        Returns:
+            Tuple of (user_response, persona_actions, goal_actions, transition_info)
+        """
+        # Most responses carry no commands at all - skip the regex walk for them
+        upper = ai_response.upper()
+        if not any(token in upper for token in _COMMAND_TOKENS):
+            return ai_response.strip(), [], [], None
+        
+        persona_actions = []
+        goal_actions = []
+        transitions = {}  # First occurrence of each transition target
+        refined_seen = False
+        user_parts = []
+        last_end = 0
+        
+        for match in _COMMAND_RE.finditer(ai_response):
+            kind = match.lastgroup
+            
+            if kind == 'persona':
+                persona_actions.append({
+                    'type': 'create',
+                    'name': match.group('persona_name').strip(),
+                    'north_star': match.group('persona_north_star').strip()
+                })
+            elif kind == 'refined':
+                if not refined_seen:
+                    refined_seen = True
+                    persona_actions.append({
+                        'type': 'update_northstar',
+                        'north_star': match.group('refined_north_star').strip()
+                    })
+            elif kind == 'goal':
+                goal_actions.append({
+                    'type': 'create',
+                    'name': match.group('goal_name').strip(),
+                    'acceptance_criteria': match.group('goal_criteria').strip(),
+                    'review_date': match.group('goal_review_date').strip()
+                })
+            elif kind == 'transition':
+                target = match.group('transition_target').upper()
+                if target in ('GOALS', 'DISCOVERY', 'REFINEMENT'):
+                    transitions.setdefault(target, match.group('transition_arg').strip())
+            elif kind == 'bare_discovery':
+                # A bare TRANSITION_TO_DISCOVERY triggers the handoff but is left in the text
+                transitions.setdefault('DISCOVERY', '')
+                continue
+            
+            user_parts.append(ai_response[last_end:match.start()])
+            last_end = match.end()
+        
+        user_parts.append(ai_response[last_end:])
+        user_response = "".join(user_parts).strip()
+        
+        # Same precedence as extract_transitions: goals, then discovery, then refinement
+        transition_info = None
+        if 'GOALS' in transitions:
+            transition_info = {
+                'to_agent': 'goal',
+                'reason': 'action_triggered',
+                'persona_name': transitions['GOALS']
+            }
+        elif 'DISCOVERY' in transitions:
+            transition_info = {
+                'to_agent': 'discovery',
+                'reason': 'educational_handoff'
+            }
+        elif 'REFINEMENT' in transitions:
+            transition_info = {
+                'to_agent': 'refinement',
+                'reason': 'action_triggered',
+                'persona_id': transitions['REFINEMENT']
+            }
+        
+        return user_response, persona_actions, goal_actions, transition_info
+    
     def build_conversation_response(
         self,
         conversation_id: str,
@@ -237,16 +808,12 @@ class BaseAgent(ABC):
         Returns:
             Complete ConversationResponse
         """
-        # Extract actions from AI response
-        persona_actions = self.extract_persona_actions(ai_response)
-        goal_actions = self.extract_goal_actions(ai_response)
-        transition_info = self.extract_transitions(ai_response)
-        
-        # Clean response for user
-        user_response = self.clean_response_for_user(ai_response)
+        # Extract actions and clean response for user in one pass
+        user_response, persona_actions, goal_actions, transition_info = self._single_pass_parse(ai_response)
         
-        # Build database changes
-        database_changes = DatabaseChanges()
+        # Everything below is assembled in-process from trusted values, so the models are
+        # built with model_construct (no validation); only inbound requests are validated
+        database_changes = DatabaseChanges.model_construct()
         if persona_actions:
             database_changes.personas_created = [
                 action for action in persona_actions if action['type'] == 'create'
@@ -257,9 +824,9 @@ class BaseAgent(ABC):
             ]
         
         # Build agent transition
-        agent_transition = AgentTransition(occurred=False)
+        agent_transition = AgentTransition.model_construct(occurred=False)
         if transition_info:
-            agent_transition = AgentTransition(
+            agent_transition = AgentTransition.model_construct(
                 occurred=True,
                 from_agent=self.agent_type,
                 to_agent=transition_info['to_agent'],
@@ -269,12 +836,12 @@ class BaseAgent(ABC):
             )
         
         # Build context updates
-        context_updates = ContextUpdates(
+        context_updates = ContextUpdates.model_construct(
             current_agent_type=self.agent_type,
             temporary_state=context.get('temporary_state', {})
         )
         
-        return ConversationResponse(
+        return ConversationResponse.model_construct(
             conversation_id=conversation_id,
             session_id=session_id,
             agent_type=self.agent_type,
@@ -285,31 +852,35 @@ class BaseAgent(ABC):
             context_updates=context_updates
         )
     
+    def build_plain_response(self, context: Dict[str, Any], user_response: str) -> ConversationResponse:
+        """
+        Build a ConversationResponse with no database changes or transition.
+        
+        Args:
+            context: Current conversation context
+            user_response: Message for the user
+            
+        Returns:
+            ConversationResponse from this agent
+        """
+        return ConversationResponse.model_construct(
+            conversation_id=context.get('conversation_id', 'unknown'),
+            session_id=context.get('session_id'),
+            agent_type=self.agent_type,
+            user_response=user_response,
+            database_changes=DatabaseChanges.model_construct(),
+            agent_transition=AgentTransition.model_construct(occurred=False),
+            context_updates=ContextUpdates.model_construct()
+        )
+    
     def _get_route_for_agent(self, agent_type: str) -> str:
         """Get frontend route for agent type"""
-        route_map = {
-            'discovery': '/personas/discovery',
-            'refinement': '/personas/edit',
-            'goal': '/goals',
-            'management': '/dashboard',
-            'educational': '/personas'
-        }
-        return route_map.get(agent_type, '/personas')
+        return _ROUTE_MAP.get(agent_type, '/personas')
     
     def _get_transition_message(self, transition_info: Dict[str, str]) -> str:
         """Generate transition message for user"""
         to_agent = transition_info['to_agent']
-        reason = transition_info.get('reason', '')
-        
-        if to_agent == 'goal':
-            persona_name = transition_info.get('persona_name', 'your persona')
-            return f"Great! Let's set some goals for {persona_name}. Moving to the goals page."
-        elif to_agent == 'discovery':
-            if reason == 'educational_handoff':
-                return "Perfect! Now that you understand personas, let me connect you with our Discovery Agent who will help you identify and create your personal personas."
-            else:
-                return "Perfect! Let's discover your personal personas. Moving to the discovery page."
-        elif to_agent == 'refinement':
-            return "I'll help you refine your persona. Let me take you to the editing interface."
-        else:
-            return f"Switching to {to_agent} mode to better help you."
\ No newline at end of file
+        message_for = _TRANSITION_MESSAGES.get(to_agent)
+        if message_for is None:
+            return f"Switching to {to_agent} mode to better help you."
+        return message_for(transition_info)
\ No newline at end of file
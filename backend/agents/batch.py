@@ -0,0 +1,103 @@
+# agents/batch.py - OpenAI Batch API helpers for non-interactive agent flows
+
+import json
+from typing import Any, Dict, List, Optional
+
+from agents.openai_client import get_client
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Batch statuses that will never reach "completed"
+BATCH_FAILED_STATUSES = frozenset({"failed", "expired", "cancelling", "cancelled"})
+
+
+class BatchFailedError(RuntimeError):
+    """A batch job ended (or is ending) without completing"""
+
+    def __init__(self, batch_id: str, status: str):
+        super().__init__(f"Batch {batch_id} {status}")
+        self.batch_id = batch_id
+        self.status = status
+
+
+async def submit_batch(requests: List[Dict[str, Any]]) -> str:
+    """
+    Upload chat-completion requests as a JSONL file and start a batch job.
+
+    Batch jobs are billed at a discount and use a separate rate-limit pool,
+    but complete asynchronously (within BATCH_COMPLETION_WINDOW), so they are
+    only suitable for bulk/cron flows, never for interactive chat.
+
+    Args:
+        requests: Dicts with 'custom_id' and 'body' (chat.completions.create arguments)
+
+    Returns:
+        OpenAI batch ID, to be passed to get_batch_results later
+    """
+    client = get_client()
+
+    lines = [
+        json.dumps({
+            "custom_id": request['custom_id'],
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": request['body']
+        })
+        for request in requests
+    ]
+    jsonl = ("\n".join(lines) + "\n").encode()
+
+    batch_file = await client.files.create(file=("batch.jsonl", jsonl), purpose="batch")
+    batch = await client.batches.create(
+        endpoint=BATCH_ENDPOINT,
+        completion_window=BATCH_COMPLETION_WINDOW,
+        input_file_id=batch_file.id
+    )
+    return batch.id
+
+
+async def get_batch_results(batch_id: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Collect the responses of a finished batch job.
+
+    Args:
+        batch_id: ID returned by submit_batch
+
+    Returns:
+        Mapping of custom_id to response text (None for requests that failed),
+        or None if the batch is still in progress
+
+    Raises:
+        BatchFailedError: If the batch failed, expired or was cancelled, so it
+            will never complete
+    """
+    client = get_client()
+
+    batch = await client.batches.retrieve(batch_id)
+    if batch.status in BATCH_FAILED_STATUSES:
+        raise BatchFailedError(batch_id, batch.status)
+    if batch.status != "completed":
+        return None
+
+    results: Dict[str, Optional[str]] = {}
+    if batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get('response') or {}
+            if response.get('status_code') == 200:
+                results[record['custom_id']] = response['body']['choices'][0]['message']['content']
+            else:
+                results[record['custom_id']] = None
+
+    # Requests that errored before producing a response are listed in the error file
+    if batch.error_file_id:
+        errors = await client.files.content(batch.error_file_id)
+        for line in errors.text.splitlines():
+            if line.strip():
+                results.setdefault(json.loads(line)['custom_id'], None)
+
+    return results
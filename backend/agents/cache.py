@@ -0,0 +1,58 @@
+# agents/cache.py - In-process cache of LLM responses shared by all agents
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+# Maximum number of cached responses; the oldest entry is evicted first
+RESPONSE_CACHE_SIZE = 1024
+
+# SHA-256 request key -> AI response, in insertion order
+_response_cache: Dict[str, str] = {}
+
+
+def make_cache_key(
+    model: str,
+    temperature: float,
+    system_prompt: str,
+    user_message: str,
+    context_message: Optional[str] = None
+) -> str:
+    """
+    Build a stable cache key over everything that determines the model's answer.
+
+    Args:
+        model: Model name sent to OpenAI
+        temperature: Sampling temperature
+        system_prompt: System prompt
+        user_message: The user's message (whitespace/case-normalized)
+        context_message: Optional per-request context sent after the system prompt
+
+    Returns:
+        Hex SHA-256 digest of the request payload
+    """
+    payload = json.dumps({
+        "model": model,
+        "temp": temperature,
+        "sys": system_prompt,
+        "ctx": context_message,
+        "usr": user_message.strip().lower()
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_response(key: str) -> Optional[str]:
+    """Return the cached response for key, or None"""
+    return _response_cache.get(key)
+
+
+def store_response(key: str, ai_response: str) -> None:
+    """Store a response, evicting the oldest entry when the cache is full"""
+    if key not in _response_cache and len(_response_cache) >= RESPONSE_CACHE_SIZE:
+        del _response_cache[next(iter(_response_cache))]
+    _response_cache[key] = ai_response
+
+
+def clear() -> None:
+    """Drop all cached responses"""
+    _response_cache.clear()
@@ -1,9 +1,18 @@
 # agents/educational.py - Educational Agent implementation
 
-import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from agents.base import BaseAgent
-from conversation_models import ConversationResponse
+from agents.intents import IntentRules
+
+
+# Intent rules in priority order - the first rule with a matching phrase wins
+_EDUCATIONAL_INTENT_RULES = IntentRules([
+    ("concept_explanation", ("what is", "what are", "what's")),
+    ("concept_explanation", ("explain", "help me understand")),
+    ("examples_request", ("examples", "example of", "show me")),
+    ("northstar_explanation", ("northstar", "north star")),
+    ("persona_education", ("persona",), ("what", "explain", "help")),
+])
 
 
 class EducationalAgent(BaseAgent):
@@ -16,39 +25,9 @@ class EducationalAgent(BaseAgent):
     - concept_clarification: "Explain northstar again"
     """
     
-    @property
-    def agent_type(self) -> str:
-        return "educational"
-    
-    @property
-    def display_name(self) -> str:
-        return "Educational Agent"
-    
-    def get_supported_intents(self) -> list[str]:
-        return [
-            "concept_explanation",
-            "persona_education", 
-            "northstar_explanation",
-            "examples_request",
-            "concept_clarification"
-        ]
-    
-    def generate_system_prompt(self, context: Dict[str, Any]) -> str:
-        """Generate educational system prompt focused on explanation only"""
-        
-        # Build conversation history string - use session history if available for full context
-        conversation_history = ""
-        history_source = context.get('session_history') or context.get('conversation_history') or []
-        if history_source:
-            history_lines = []
-            for msg in history_source:
-                from_user = msg.get('from', msg.get('from_user', 'unknown'))
-                text = msg.get('text', msg.get('message', ''))
-                agent_type = msg.get('agent_type', 'unknown')
-                history_lines.append(f"{from_user} ({agent_type}): {text}")
-            conversation_history = "\n".join(history_lines)
-        
-        system_prompt = f"""You are an Educational Agent that explains persona and northstar concepts clearly and concisely.
+    # Instruction block, byte-identical on every request so OpenAI can cache the prompt prefix.
+    # Per-request conversation history goes in a separate message (see generate_context_message).
+    _SYSTEM_PROMPT_STATIC = """You are an Educational Agent that explains persona and northstar concepts clearly and concisely.
 
 Your role is EDUCATION ONLY - you explain concepts but don't create anything.
 
@@ -75,103 +54,48 @@ EXAMPLES OF WHEN TO TRANSITION:
 DO NOT CREATE PERSONAS - that's the Discovery Agent's job.
 DO NOT automatically transition - wait for user confirmation.
 
-CONVERSATION CONTEXT:
-{conversation_history}
-
-Be clear, concise, and educational. Explain concepts, then wait for the user to decide their next step."""
+Be clear, concise, and educational. Explain concepts, then wait for the user to decide their next step.
 
-        return system_prompt
+CONVERSATION CONTEXT:
+"""
+    
+    _SUPPORTED_INTENTS = (
+        "concept_explanation",
+        "persona_education",
+        "northstar_explanation",
+        "examples_request",
+        "concept_clarification"
+    )
+    # Supported intents plus aliases, as a set for O(1) routing checks
+    _HANDLED_INTENTS = frozenset(_SUPPORTED_INTENTS + ("what_is", "explain", "help_understand"))
+    
+    @property
+    def agent_type(self) -> str:
+        return "educational"
     
-    async def call_openai(self, system_prompt: str, user_message: str) -> str:
-        """Call OpenAI API with system prompt and user message"""
-        import openai
-        
-        # Get API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Using the same model as frontend
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
-        
-        except Exception as e:
-            raise Exception(f"OpenAI API call failed: {str(e)}")
+    @property
+    def display_name(self) -> str:
+        return "Educational Agent"
+    
+    def get_supported_intents(self) -> list[str]:
+        return list(self._SUPPORTED_INTENTS)
+    
+    def generate_system_prompt(self, context: Dict[str, Any]) -> str:
+        """Generate educational system prompt focused on explanation only"""
+        return self._SYSTEM_PROMPT_STATIC + self.generate_context_message(context)
     
-    async def process_ai_response(self, ai_response: str, context: Dict[str, Any]) -> ConversationResponse:
-        """Process AI response and return structured ConversationResponse"""
-        
-        conversation_id = context.get('conversation_id', 'unknown')
-        session_id = context.get('session_id')
-        previous_agent_type = context.get('previous_agent_type')
-        
-        # Use BaseAgent's utility method to build complete response
-        return self.build_conversation_response(
-            conversation_id=conversation_id,
-            session_id=session_id,
-            ai_response=ai_response,
-            context=context,
-            previous_agent_type=previous_agent_type
-        )
+    def generate_context_message(self, context: Dict[str, Any]) -> str:
+        """Render the per-request conversation history that follows the static prompt"""
+        return self.render_session_history(context)
     
-    async def process_message(self, user_message: str, context: Dict[str, Any]) -> ConversationResponse:
-        """
-        Main entry point for processing a user message.
-        
-        Args:
-            user_message: The user's message
-            context: Conversation context including history, IDs, etc.
-            
-        Returns:
-            ConversationResponse with AI response and any actions
-        """
-        # Generate system prompt
-        system_prompt = self.generate_system_prompt(context)
-        
-        # Call OpenAI
-        ai_response = await self.call_openai(system_prompt, user_message)
-        
-        # Process and return structured response
-        return await self.process_ai_response(ai_response, context)
+    def build_prompt(self, context: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Static system prompt, with the conversation history as a separate context message"""
+        return self._SYSTEM_PROMPT_STATIC, self.generate_context_message(context)
     
     def can_handle_intent(self, intent: str, context: Dict[str, Any]) -> bool:
         """Check if this agent can handle the given intent"""
-        educational_intents = [
-            "concept_explanation",
-            "persona_education",
-            "northstar_explanation", 
-            "examples_request",
-            "concept_clarification",
-            "what_is",
-            "explain",
-            "help_understand"
-        ]
-        return intent in educational_intents
+        return intent in self._HANDLED_INTENTS
     
     def analyze_message_for_intent(self, message: str) -> str:
         """Analyze a message to determine if it matches educational intents"""
-        msg = message.lower()
-        
-        if any(phrase in msg for phrase in ["what is", "what are", "what's"]):
-            return "concept_explanation"
-        elif any(phrase in msg for phrase in ["explain", "help me understand"]):
-            return "concept_explanation"  
-        elif any(phrase in msg for phrase in ["examples", "example of", "show me"]):
-            return "examples_request"
-        elif "northstar" in msg or "north star" in msg:
-            return "northstar_explanation"
-        elif "persona" in msg and any(phrase in msg for phrase in ["what", "explain", "help"]):
-            return "persona_education"
-        else:
-            return "concept_clarification"  # Default for educational agent
\ No newline at end of file
+        return _EDUCATIONAL_INTENT_RULES.classify(message, default="concept_clarification")
@@ -0,0 +1,64 @@
+# agents/intents.py - Phrase-based intent rules matched in a single scan
+
+import re
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+
+class IntentRules:
+    """
+    Ordered intent rules matched against a message with one regex scan.
+    
+    Each rule is (intent, phrases, [more_phrases, ...]): the rule applies when the
+    message contains at least one phrase from every group (case-insensitive).
+    As with an if/elif chain, the first rule that applies wins, regardless
+    of where in the message its phrase appears.
+    
+    All phrases of all rules are compiled into one pattern that reports which
+    phrase starts at each position (like a multi-pattern DFA with pattern IDs),
+    so the message is scanned once no matter how many rules there are.
+    """
+    
+    def __init__(self, rules: Sequence[Tuple]):
+        phrase_ids: Dict[str, int] = {}
+        self._rules: List[Tuple[str, Tuple[FrozenSet[int], ...]]] = []
+        for intent, *phrase_groups in rules:
+            groups = tuple(
+                frozenset(phrase_ids.setdefault(phrase.lower(), len(phrase_ids)) for phrase in phrases)
+                for phrases in phrase_groups
+            )
+            self._rules.append((intent, groups))
+        
+        # Longest phrases first, so a match at a position is the longest phrase starting there;
+        # every shorter phrase that is a prefix of it matched at that position too
+        phrases = sorted(phrase_ids, key=len, reverse=True)
+        self._implied: Dict[str, FrozenSet[int]] = {
+            phrase: frozenset(phrase_ids[other] for other in phrases if phrase.startswith(other))
+            for phrase in phrases
+        }
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(phrase) for phrase in phrases) + "))",
+            re.DOTALL
+        )
+    
+    def classify(self, message: str, default: str) -> str:
+        """
+        Return the intent of the first matching rule, or default if none match.
+        
+        Args:
+            message: User message
+            default: Intent to return when no rule applies
+            
+        Returns:
+            Intent string
+        """
+        implied = self._implied
+        found = set()
+        for phrase in self._pattern.findall(message.lower()):
+            found |= implied[phrase]
+        if not found:
+            return default
+        
+        for intent, groups in self._rules:
+            if all(not group.isdisjoint(found) for group in groups):
+                return intent
+        return default
@@ -1,11 +1,23 @@
 # agents/management.py - Management Agent implementation
 
-import os
-from typing import Dict, Any
+import json
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
 from agents.base import BaseAgent
+from agents.intents import IntentRules
+from agents.openai_client import create_chat_completion, get_client
 from conversation_models import ConversationResponse
 
 
+# Intent rules in priority order - the first rule with a matching phrase wins
+_MANAGEMENT_INTENT_RULES = IntentRules([
+    ("overview_request", ("show me all", "overview", "dashboard", "summary")),
+    ("progress_review", ("how am i doing", "progress", "review")),
+    ("prioritization", ("prioritize", "focus on", "what should i")),
+    ("strategic_planning", ("strategic", "long term", "big picture")),
+    ("persona_management", ("manage", "organize", "coordinate")),
+])
+
+
 class ManagementAgent(BaseAgent):
     """
     Management Agent specializes in providing overview and managing existing personas and goals.
@@ -17,46 +29,9 @@ class ManagementAgent(BaseAgent):
     - strategic_planning: "What should I focus on?"
     """
     
-    @property
-    def agent_type(self) -> str:
-        return "management"
-    
-    @property
-    def display_name(self) -> str:
-        return "Management Agent"
-    
-    def get_supported_intents(self) -> list[str]:
-        return [
-            "overview_request",
-            "progress_review",
-            "prioritization",
-            "strategic_planning",
-            "dashboard_view",
-            "persona_management",
-            "goal_overview"
-        ]
-    
-    def generate_system_prompt(self, context: Dict[str, Any]) -> str:
-        """Generate management system prompt for overview and strategic guidance"""
-        
-        # Build conversation history string
-        conversation_history = ""
-        if context.get('conversation_history'):
-            history_lines = []
-            for msg in context['conversation_history']:
-                from_user = msg.get('from', msg.get('from_user', 'unknown'))
-                text = msg.get('text', msg.get('message', ''))
-                history_lines.append(f"{from_user}: {text}")
-            conversation_history = "\n".join(history_lines)
-        
-        # Get user personas and goals info (would be loaded from database in real implementation)
-        user_data_info = ""
-        if context.get('user_personas'):
-            user_data_info += f"User has {len(context['user_personas'])} personas defined."
-        if context.get('user_goals'):
-            user_data_info += f" User has {len(context['user_goals'])} active goals."
-        
-        system_prompt = f"""You are a Management Agent that provides strategic overview and helps users manage their personas and goals effectively.
+    # Constant prompt prefix; the user data context and conversation history are sent
+    # after it (generate_context_message) so only the tail changes between requests
+    _SYSTEM_PROMPT_STATIC = """You are a Management Agent that provides strategic overview and helps users manage their personas and goals effectively.
 
 Your role is STRATEGIC MANAGEMENT - help users see the big picture, prioritize effectively, and make strategic decisions about their personal development.
 
@@ -86,108 +61,142 @@ RESPONSE STYLE:
 - Help them see patterns and opportunities
 - Guide toward balanced development
 
-USER DATA CONTEXT:
-{user_data_info}
-
-CONVERSATION CONTEXT:
-{conversation_history}
-
-Help them manage their personal development journey strategically and holistically."""
+Help them manage their personal development journey strategically and holistically.
 
-        return system_prompt
+"""
     
-    async def call_openai(self, system_prompt: str, user_message: str) -> str:
-        """Call OpenAI API with system prompt and user message"""
-        import openai
-        
-        # Get API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
-        
-        except Exception as e:
-            raise Exception(f"OpenAI API call failed: {str(e)}")
+    # Prompt only renders the current conversation
+    needs_session_history = False
     
-    async def process_ai_response(self, ai_response: str, context: Dict[str, Any]) -> ConversationResponse:
-        """Process AI response and return structured ConversationResponse"""
-        
-        conversation_id = context.get('conversation_id', 'unknown')
-        session_id = context.get('session_id')
-        previous_agent_type = context.get('previous_agent_type')
+    _SUPPORTED_INTENTS = (
+        "overview_request",
+        "progress_review",
+        "prioritization",
+        "strategic_planning",
+        "dashboard_view",
+        "persona_management",
+        "goal_overview"
+    )
+    # Supported intents plus aliases, as a set for O(1) routing checks
+    _HANDLED_INTENTS = frozenset(_SUPPORTED_INTENTS + ("show_all", "manage_personas", "strategic_review"))
+    
+    @property
+    def agent_type(self) -> str:
+        return "management"
+    
+    @property
+    def display_name(self) -> str:
+        return "Management Agent"
+    
+    def get_supported_intents(self) -> list[str]:
+        return list(self._SUPPORTED_INTENTS)
+    
+    def generate_system_prompt(self, context: Dict[str, Any]) -> str:
+        """Generate management system prompt for overview and strategic guidance"""
+        return self._SYSTEM_PROMPT_STATIC + self.generate_context_message(context)
+    
+    def generate_context_message(self, context: Dict[str, Any]) -> str:
+        """Render the per-request user data context and conversation history that follow the static prompt"""
+        # Get user personas and goals info (would be loaded from database in real implementation)
+        user_data_info = ""
+        if context.get('user_personas'):
+            user_data_info += f"User has {len(context['user_personas'])} personas defined."
+        if context.get('user_goals'):
+            user_data_info += f" User has {len(context['user_goals'])} active goals."
         
-        # Use BaseAgent's utility method to build complete response
-        return self.build_conversation_response(
-            conversation_id=conversation_id,
-            session_id=session_id,
-            ai_response=ai_response,
-            context=context,
-            previous_agent_type=previous_agent_type
+        return self.join_context_sections(
+            ("USER DATA CONTEXT:", user_data_info),
+            ("CONVERSATION CONTEXT:", self.render_conversation_history(context))
         )
     
+    def build_prompt(self, context: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Static system prompt, with the user data context and history as a separate context message"""
+        return self._SYSTEM_PROMPT_STATIC, self.generate_context_message(context)
+    
     async def process_message(self, user_message: str, context: Dict[str, Any]) -> ConversationResponse:
+        """Answer context['bulk_personas'] (set only when the caller opts in) in one request, otherwise the standard flow"""
+        if context.get('bulk_personas'):
+            return await self._process_bulk_personas(context)
+        return await super().process_message(user_message, context)
+    
+    async def process_message_stream(
+        self,
+        user_message: str,
+        context: Dict[str, Any]
+    ) -> AsyncIterator[Union[str, ConversationResponse]]:
+        """Streaming variant of process_message; bulk summaries arrive as JSON, so they are sent in one piece"""
+        if context.get('bulk_personas'):
+            response = await self._process_bulk_personas(context)
+            yield response.user_response
+            yield response
+            return
+        async for item in super().process_message_stream(user_message, context):
+            yield item
+    
+    async def summarize_personas(self, personas: List[Dict[str, Any]], context: Dict[str, Any]) -> List[str]:
         """
-        Main entry point for processing a user message.
+        Summarize several personas with a single JSON-mode OpenAI request.
         
         Args:
-            user_message: The user's message
-            context: Conversation context including history, IDs, etc.
+            personas: Persona dicts with 'name' and 'north_star'
+            context: Conversation context used for the system prompt
             
         Returns:
-            ConversationResponse with AI response and any actions
+            One summary per persona, in input order ("" if the model skipped one)
         """
-        # Generate system prompt
-        system_prompt = self.generate_system_prompt(context)
+        inputs = "\n".join(
+            f"{i}) {persona.get('name', 'Unknown')}: {persona.get('north_star', 'Not defined')}"
+            for i, persona in enumerate(personas, 1)
+        )
+        user_message = (
+            'Summarize each persona. Respond with a JSON object {"summaries": [...]} containing '
+            f"one summary string per input, in the same order. Inputs:\n{inputs}"
+        )
         
-        # Call OpenAI
-        ai_response = await self.call_openai(system_prompt, user_message)
+        client = get_client()
+        
+        response = await create_chat_completion(
+            client,
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.generate_system_prompt(context)},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            response_format={"type": "json_object"}
+        )
         
-        # Process and return structured response
-        return await self.process_ai_response(ai_response, context)
+        try:
+            summaries = json.loads(response.choices[0].message.content).get('summaries') or []
+        except (json.JSONDecodeError, AttributeError):
+            summaries = []
+        
+        summaries = [str(summary) for summary in summaries[:len(personas)]]
+        return summaries + [""] * (len(personas) - len(summaries))
+    
+    async def _process_bulk_personas(self, context: Dict[str, Any]) -> ConversationResponse:
+        """Build a ConversationResponse from one bulk summary request over context['bulk_personas']"""
+        personas = context['bulk_personas']
+        summaries = await self.summarize_personas(personas, context)
+        
+        persona_summaries = [
+            {'persona': persona.get('name', 'Unknown'), 'summary': summary}
+            for persona, summary in zip(personas, summaries)
+        ]
+        ai_response = "\n\n".join(f"{item['persona']}: {item['summary']}" for item in persona_summaries)
+        
+        response = await self.process_ai_response(ai_response, context)
+        response.context_updates.temporary_state = {
+            **(response.context_updates.temporary_state or {}),
+            'persona_summaries': persona_summaries
+        }
+        return response
     
     def can_handle_intent(self, intent: str, context: Dict[str, Any]) -> bool:
         """Check if this agent can handle the given intent"""
-        management_intents = [
-            "overview_request",
-            "progress_review",
-            "prioritization",
-            "strategic_planning",
-            "dashboard_view",
-            "persona_management", 
-            "goal_overview",
-            "show_all",
-            "manage_personas",
-            "strategic_review"
-        ]
-        return intent in management_intents
+        return intent in self._HANDLED_INTENTS
     
     def analyze_message_for_intent(self, message: str) -> str:
         """Analyze a message to determine if it matches management intents"""
-        msg = message.lower()
-        
-        if any(phrase in msg for phrase in ["show me all", "overview", "dashboard", "summary"]):
-            return "overview_request"
-        elif any(phrase in msg for phrase in ["how am i doing", "progress", "review"]):
-            return "progress_review"
-        elif any(phrase in msg for phrase in ["prioritize", "focus on", "what should i"]):
-            return "prioritization" 
-        elif any(phrase in msg for phrase in ["strategic", "long term", "big picture"]):
-            return "strategic_planning"
-        elif any(phrase in msg for phrase in ["manage", "organize", "coordinate"]):
-            return "persona_management"
-        else:
-            return "overview_request"  # Default for management agent
\ No newline at end of file
+        return _MANAGEMENT_INTENT_RULES.classify(message, default="overview_request")
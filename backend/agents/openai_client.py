@@ -0,0 +1,130 @@
+# agents/openai_client.py - Shared OpenAI client for all agents
+
+import asyncio
+import os
+import random
+import weakref
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+
+import openai
+
+# At most this many OpenAI requests in flight per event loop
+MAX_CONCURRENCY = 10
+
+# Retry schedule for transient errors: 1s, 2s, 4s, 8s (plus up to 1s jitter,
+# capped at 30s) between 5 attempts
+MAX_ATTEMPTS = 5
+INITIAL_BACKOFF_SECONDS = 1.0
+BACKOFF_FACTOR = 2
+BACKOFF_JITTER_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+# Transient failures worth retrying; anything else (e.g. BadRequestError,
+# AuthenticationError) propagates on the first attempt
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+# Semaphores are created per event loop (an asyncio.Semaphore is bound to one loop)
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+@lru_cache(maxsize=1)
+def get_client() -> openai.AsyncOpenAI:
+    """
+    Return the process-wide AsyncOpenAI client, creating it on first use.
+
+    One client (and so one HTTP connection pool) is shared by every agent,
+    keeping connections and TLS sessions warm across requests.
+
+    Returns:
+        Configured AsyncOpenAI client
+
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set
+    """
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+
+    # Retries are handled by create_chat_completion so they don't compound
+    return openai.AsyncOpenAI(api_key=api_key, timeout=30, max_retries=0)
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Return the concurrency limiter for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+async def create_chat_completion(client: openai.AsyncOpenAI, **kwargs):
+    """
+    Create a chat completion with bounded concurrency and exponential backoff.
+
+    Only transient errors (_RETRYABLE_ERRORS) are retried, with jittered
+    backoff so concurrent callers don't retry in lockstep.
+
+    Args:
+        client: Client from get_client()
+        **kwargs: Arguments for client.chat.completions.create
+
+    Returns:
+        The OpenAI ChatCompletion response
+
+    Raises:
+        openai.APIError: The first non-transient error, or the last transient
+            one if every attempt failed
+    """
+    async with _get_semaphore():
+        return await _create_with_retries(client, **kwargs)
+
+
+@asynccontextmanager
+async def stream_chat_completion(client: openai.AsyncOpenAI, **kwargs) -> AsyncIterator:
+    """
+    Open a streamed chat completion, holding a concurrency slot until it is read.
+
+    Unlike create_chat_completion, the slot is kept for the whole stream: it is
+    released only when the block exits, after the stream is exhausted, closed or
+    abandoned. Only opening the stream is retried; a stream that fails midway
+    isn't restarted, as its earlier chunks may already have been sent on.
+
+    Args:
+        client: Client from get_client()
+        **kwargs: Arguments for client.chat.completions.create (stream=True is set)
+
+    Yields:
+        The OpenAI AsyncStream of ChatCompletionChunks
+
+    Raises:
+        openai.APIError: As for create_chat_completion, when opening the stream
+    """
+    async with _get_semaphore():
+        stream = await _create_with_retries(client, stream=True, **kwargs)
+        try:
+            yield stream
+        finally:
+            await stream.close()
+
+
+async def _create_with_retries(client: openai.AsyncOpenAI, **kwargs):
+    """client.chat.completions.create, retrying transient errors with jittered backoff"""
+    delay = INITIAL_BACKOFF_SECONDS
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except _RETRYABLE_ERRORS:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            await asyncio.sleep(min(delay + random.uniform(0, BACKOFF_JITTER_SECONDS), MAX_BACKOFF_SECONDS))
+            delay *= BACKOFF_FACTOR
@@ -1,11 +1,20 @@
 # agents/refinement.py - Refinement Agent implementation
 
-import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from agents.base import BaseAgent
+from agents.intents import IntentRules
 from conversation_models import ConversationResponse
 
 
+# Intent rules in priority order - the first rule with a matching phrase wins
+_REFINEMENT_INTENT_RULES = IntentRules([
+    ("persona_refinement", ("refine", "improve", "make better")),
+    ("persona_update", ("update", "change", "modify")),
+    ("northstar_refinement", ("northstar",), ("refine", "improve", "change")),
+    ("persona_editing", ("edit", "fix", "adjust")),
+])
+
+
 class RefinementAgent(BaseAgent):
     """
     Refinement Agent specializes in improving and refining existing personas.
@@ -18,47 +27,9 @@ class RefinementAgent(BaseAgent):
     Requires target_persona_id in context to work on specific personas.
     """
     
-    @property
-    def agent_type(self) -> str:
-        return "refinement"
-    
-    @property
-    def display_name(self) -> str:
-        return "Refinement Agent"
-    
-    def get_supported_intents(self) -> list[str]:
-        return [
-            "persona_refinement",
-            "persona_update",
-            "persona_modification",
-            "northstar_refinement",
-            "persona_improvement",
-            "persona_editing"
-        ]
-    
-    def generate_system_prompt(self, context: Dict[str, Any]) -> str:
-        """Generate refinement system prompt for persona improvement"""
-        
-        # Build conversation history string
-        conversation_history = ""
-        if context.get('conversation_history'):
-            history_lines = []
-            for msg in context['conversation_history']:
-                from_user = msg.get('from', msg.get('from_user', 'unknown'))
-                text = msg.get('text', msg.get('message', ''))
-                history_lines.append(f"{from_user}: {text}")
-            conversation_history = "\n".join(history_lines)
-        
-        # Get target persona information if available
-        target_persona_info = ""
-        if context.get('target_persona_id'):
-            target_persona_info = f"Target Persona ID: {context['target_persona_id']}"
-            if context.get('target_persona'):
-                persona = context['target_persona']
-                target_persona_info += f"\nCurrent Persona: {persona.get('name', 'Unknown')}"
-                target_persona_info += f"\nCurrent Northstar: {persona.get('north_star', 'Not defined')}"
-        
-        system_prompt = f"""You are a Refinement Agent that helps users improve and refine their existing personas.
+    # Constant prompt prefix; the target persona context and conversation history are sent
+    # after it (generate_context_message) so only the tail changes between requests
+    _SYSTEM_PROMPT_STATIC = """You are a Refinement Agent that helps users improve and refine their existing personas.
 
 Your role is PERSONA REFINEMENT - help users make their existing personas better, more specific, and more meaningful.
 
@@ -83,118 +54,75 @@ GOAL TRANSITION DETECTION:
 If the user wants to turn the refined persona into goals or actionable steps, respond with:
 TRANSITION_TO_GOALS: [persona name]
 
-TARGET PERSONA CONTEXT:
-{target_persona_info}
-
-CONVERSATION CONTEXT:
-{conversation_history}
+Be thoughtful and help them make their personas more powerful and meaningful. Ask probing questions to understand what they really want from this persona.
 
-Be thoughtful and help them make their personas more powerful and meaningful. Ask probing questions to understand what they really want from this persona."""
-
-        return system_prompt
+"""
     
-    async def call_openai(self, system_prompt: str, user_message: str) -> str:
-        """Call OpenAI API with system prompt and user message"""
-        import openai
-        
-        # Get API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-        client = openai.OpenAI(api_key=api_key)
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
-        
-        except Exception as e:
-            raise Exception(f"OpenAI API call failed: {str(e)}")
+    # Refinement replies are short suggestions and questions
+    max_tokens = 400
+    # Prompt only renders the current conversation
+    needs_session_history = False
     
-    async def process_ai_response(self, ai_response: str, context: Dict[str, Any]) -> ConversationResponse:
-        """Process AI response and return structured ConversationResponse"""
-        
-        conversation_id = context.get('conversation_id', 'unknown')
-        session_id = context.get('session_id')
-        previous_agent_type = context.get('previous_agent_type')
+    _SUPPORTED_INTENTS = (
+        "persona_refinement",
+        "persona_update",
+        "persona_modification",
+        "northstar_refinement",
+        "persona_improvement",
+        "persona_editing"
+    )
+    # Supported intents plus aliases, as a set for O(1) routing checks
+    _HANDLED_INTENTS = frozenset(_SUPPORTED_INTENTS + ("refine_persona", "improve_persona", "update_persona"))
+    
+    @property
+    def agent_type(self) -> str:
+        return "refinement"
+    
+    @property
+    def display_name(self) -> str:
+        return "Refinement Agent"
+    
+    def get_supported_intents(self) -> list[str]:
+        return list(self._SUPPORTED_INTENTS)
+    
+    def generate_system_prompt(self, context: Dict[str, Any]) -> str:
+        """Generate refinement system prompt for persona improvement"""
+        return self._SYSTEM_PROMPT_STATIC + self.generate_context_message(context)
+    
+    def generate_context_message(self, context: Dict[str, Any]) -> str:
+        """Render the per-request target persona context and conversation history that follow the static prompt"""
+        # Get target persona information if available
+        target_persona_info = ""
+        if context.get('target_persona_id'):
+            target_persona_info = f"Target Persona ID: {context['target_persona_id']}"
+            if context.get('target_persona'):
+                persona = context['target_persona']
+                target_persona_info += f"\nCurrent Persona: {persona.get('name', 'Unknown')}"
+                target_persona_info += f"\nCurrent Northstar: {persona.get('north_star', 'Not defined')}"
         
-        # Use BaseAgent's utility method to build complete response
-        return self.build_conversation_response(
-            conversation_id=conversation_id,
-            session_id=session_id,
-            ai_response=ai_response,
-            context=context,
-            previous_agent_type=previous_agent_type
+        return self.join_context_sections(
+            ("TARGET PERSONA CONTEXT:", target_persona_info),
+            ("CONVERSATION CONTEXT:", self.render_conversation_history(context))
         )
     
-    async def process_message(self, user_message: str, context: Dict[str, Any]) -> ConversationResponse:
-        """
-        Main entry point for processing a user message.
-        
-        Args:
-            user_message: The user's message
-            context: Conversation context including history, IDs, etc.
-            
-        Returns:
-            ConversationResponse with AI response and any actions
-        """
-        # Check if we have a target persona
+    def build_prompt(self, context: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """Static system prompt, with the target persona context and history as a separate context message"""
+        return self._SYSTEM_PROMPT_STATIC, self.generate_context_message(context)
+    
+    def _precheck(self, context: Dict[str, Any]) -> Optional[ConversationResponse]:
+        """Ask which persona to work on when no target_persona_id is set"""
         if not context.get('target_persona_id'):
             # If no target persona, we should probably transition back or ask for clarification
-            return ConversationResponse(
-                conversation_id=context.get('conversation_id', 'unknown'),
-                session_id=context.get('session_id'),
-                agent_type=self.agent_type,
-                user_response="I need to know which persona you'd like to refine. Could you specify which persona you want to work on?",
-                database_changes={},
-                agent_transition={'occurred': False},
-                context_updates={}
+            return self.build_plain_response(
+                context,
+                "I need to know which persona you'd like to refine. Could you specify which persona you want to work on?"
             )
-        
-        # Generate system prompt
-        system_prompt = self.generate_system_prompt(context)
-        
-        # Call OpenAI
-        ai_response = await self.call_openai(system_prompt, user_message)
-        
-        # Process and return structured response
-        return await self.process_ai_response(ai_response, context)
+        return None
     
     def can_handle_intent(self, intent: str, context: Dict[str, Any]) -> bool:
         """Check if this agent can handle the given intent"""
-        refinement_intents = [
-            "persona_refinement",
-            "persona_update",
-            "persona_modification", 
-            "northstar_refinement",
-            "persona_improvement",
-            "persona_editing",
-            "refine_persona",
-            "improve_persona",
-            "update_persona"
-        ]
-        return intent in refinement_intents
+        return intent in self._HANDLED_INTENTS
     
     def analyze_message_for_intent(self, message: str) -> str:
         """Analyze a message to determine if it matches refinement intents"""
-        msg = message.lower()
-        
-        if any(phrase in msg for phrase in ["refine", "improve", "make better"]):
-            return "persona_refinement"
-        elif any(phrase in msg for phrase in ["update", "change", "modify"]):
-            return "persona_update"
-        elif "northstar" in msg and any(phrase in msg for phrase in ["refine", "improve", "change"]):
-            return "northstar_refinement"
-        elif any(phrase in msg for phrase in ["edit", "fix", "adjust"]):
-            return "persona_editing"
-        else:
-            return "persona_refinement"  # Default for refinement agent
\ No newline at end of file
+        return _REFINEMENT_INTENT_RULES.classify(message, default="persona_refinement")
@@ -1,18 +1,215 @@
 # conversation_manager.py - Orchestrates agent selection and conversation flow
 
+import asyncio
+import logging
 import re
-from typing import Dict, Any, Optional, Tuple
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from sqlalchemy import cast, func, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
 from datetime import datetime
+from uuid import UUID, uuid4
 
-from conversation_models import ConversationRequest, ConversationResponse
+from conversation_models import ConversationRequest, ConversationResponse, DatabaseChanges
+from agents.base import HISTORY_SUMMARY_INTERVAL, HISTORY_WINDOW, history_summary_due
 from agents.educational import EducationalAgent
 from agents.discovery import DiscoveryAgent
 from agents.refinement import RefinementAgent
 from agents.goal import GoalAgent
 from agents.management import ManagementAgent
-from models import Conversation
+from db import SessionLocal
+from models import Conversation, Goal, Persona
 
+logger = logging.getLogger(__name__)
+
+
+# Raw intent patterns for routing, in priority order (compiled per ConversationManager)
+INTENT_PATTERNS = {
+    # Educational intents
+    'concept_explanation': [
+        r'what\s+is\s+a?\s*(persona|northstar|north\s*star)',
+        r'explain\s+(persona|northstar|north\s*star)',
+        r'what\s+are\s+(personas|northstars|north\s*stars)',
+        r'help\s+me\s+understand\s+(persona|northstar)',
+        r'meaning\s+of\s+life',
+        r'what.*persona.*mean',
+        r'define\s+(persona|northstar)'
+    ],
+    
+    'examples_request': [
+        r'give\s+me\s+examples?\s+of\s+(persona|northstar)',
+        r'show\s+me\s+examples?\s+of\s+(persona|northstar)',
+        r'examples?\s+of\s+(persona|northstar)',
+        r'can\s+you\s+show\s+me.*examples?'
+    ],
+    
+    # Discovery intents (for future use)
+    'persona_creation': [
+        r'create\s+my\s+(persona|personas)',
+        r'discover\s+my\s+(persona|personas)',
+        r'find\s+my\s+(persona|personas)',
+        r'identify\s+my\s+(persona|personas)',
+        r'ready\s+to\s+(create|discover)',
+        r'let.*s\s+(create|discover|find)\s+my',
+        r'(want\s+to\s+|i\s+want\s+to\s+)?(create|discover|find)\s+(my\s+)?(persona|personas)',
+        r'i\s+want\s+to\s+(create|discover|find)'
+    ],
+    
+    # Refinement intents (for future use)
+    'persona_refinement': [
+        r'improve\s+my\s+.*persona',
+        r'refine\s+my\s+.*persona',
+        r'update\s+my\s+.*persona',
+        r'change\s+my\s+.*persona',
+        r'modify\s+my\s+.*persona',
+        r'better.*persona'
+    ],
+    
+    # Goal intents
+    'goal_setting': [
+        r'set\s+goals?\s+for',
+        r'create\s+goals?\s+for',
+        r'goals?\s+for\s+my\s+.*persona',
+        r'turn.*into\s+goals?',
+        r'actionable\s+steps',
+        r'daily\s+practices'
+    ],
+    
+    # Management intents
+    'overview_request': [
+        r'show\s+me\s+all\s+my\s+(personas|goals)',
+        r'list\s+all\s+my\s+(personas|goals)',
+        r'overview\s+of\s+my\s+(personas|goals)',
+        r'dashboard',
+        r'summary\s+of\s+my',
+        r'all\s+my\s+(personas|goals)'
+    ],
+    
+    'progress_review': [
+        r'how\s+am\s+i\s+doing',
+        r'progress\s+on\s+my',
+        r'review\s+my\s+progress',
+        r'check\s+my\s+progress'
+    ],
+    
+    'strategic_planning': [
+        r'what\s+should\s+i\s+focus\s+on',
+        r'prioritize\s+my',
+        r'strategic\s+planning',
+        r'big\s+picture',
+        r'long\s+term'
+    ],
+    
+    # Affirmative responses
+    'affirmative_response': [
+        r'^yes$',
+        r'^yeah$',
+        r'^yep$',
+        r'^sure$',
+        r'^okay$',
+        r'^ok$',
+        r'yes,?\s+',
+        r'that\s+sounds?\s+good',
+        r'i\s*\'?d\s+like\s+that',
+        r'let\s*\'?s\s+do\s+it',
+        r'sounds?\s+great'
+    ],
+    
+    # Negative responses
+    'negative_response': [
+        r'^no$',
+        r'^nah$',
+        r'^nope$',
+        r'no,?\s+',
+        r'not\s+yet',
+        r'not\s+now',
+        r'maybe\s+later',
+        r'not\s+ready'
+    ]
+}
+
+
+# Most recent session messages passed to agents: prompts render HISTORY_WINDOW of
+# them, after the history summary when there are more. (Summary refreshes load the
+# full session history themselves, see _refresh_history_summary)
+SESSION_HISTORY_LIMIT = HISTORY_SUMMARY_INTERVAL + HISTORY_WINDOW
+
+# Maximum number of normalized messages whose pattern-sweep result is remembered
+INTENT_CACHE_SIZE = 4096
+
+# Bare yes/no replies, recognised by set lookup before any regex runs
+AFFIRMATIVE_REPLIES = frozenset({'yes', 'yeah', 'yep', 'sure', 'okay', 'ok'})
+NEGATIVE_REPLIES = frozenset({'no', 'nah', 'nope', 'not yet', 'not now', 'maybe later', 'not ready'})
+
+
+def _required_literal(pattern: str) -> Optional[str]:
+    """
+    Return the longest plain-word run every match of pattern must contain.
+    
+    Only top-level, unquantified letters count (groups, escapes, character
+    classes, optional characters and wildcards end a run). Returns None if the pattern has a
+    top-level alternation, or no run of at least 3 letters.
+    """
+    runs = []
+    current = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        optional_next = i + 1 < len(pattern) and pattern[i + 1] in "?*{"
+        if char == "\\":
+            runs.append(current)
+            current = ""
+            i += 2
+            continue
+        if char == "[":
+            # Character class: skip to its closing bracket
+            runs.append(current)
+            current = ""
+            i = pattern.index("]", i + 2) + 1
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None
+        
+        if depth == 0 and (char.isalpha() or char == " ") and not optional_next:
+            current += char
+        else:
+            runs.append(current)
+            current = ""
+        i += 1
+    runs.append(current)
+    
+    longest = max(runs, key=len).strip()
+    return longest.lower() if len(longest) >= 3 else None
+
+
+
+# Anchored plain-text pattern: ^words$ (exact reply) or ^words (prefix)
+_ANCHORED_LITERAL_RE = re.compile(r"\^([a-z ]+)(\$?)")
+
+
+def _partition_patterns(patterns: List[str]) -> Tuple[frozenset, Tuple[str, ...], List[str]]:
+    """
+    Split an intent's patterns into (exact literals, prefix literals, remaining regexes).
+    
+    Anchored plain-text patterns like ^yes$ are answered with a set lookup or
+    str.startswith instead of the regex engine; everything else stays a regex.
+    """
+    exact, prefixes, regexes = set(), [], []
+    for pattern in patterns:
+        anchored = _ANCHORED_LITERAL_RE.fullmatch(pattern)
+        if anchored is None:
+            regexes.append(pattern)
+        elif anchored.group(2):
+            exact.add(anchored.group(1))
+        else:
+            prefixes.append(anchored.group(1))
+    return frozenset(exact), tuple(prefixes), regexes
 
 class ConversationManager:
     """
@@ -26,119 +223,78 @@ class ConversationManager:
     """
     
     def __init__(self):
-        # Register available agents
-        self.agents = {
-            'educational': EducationalAgent(),
-            'discovery': DiscoveryAgent(),
-            'refinement': RefinementAgent(), 
-            'goal': GoalAgent(),
-            'management': ManagementAgent()
+        # Register available agents; each is instantiated on first use (_get_agent)
+        self._agent_factories = {
+            'educational': EducationalAgent,
+            'discovery': DiscoveryAgent,
+            'refinement': RefinementAgent, 
+            'goal': GoalAgent,
+            'management': ManagementAgent
         }
+        self._agent_instances: Dict[str, Any] = {}
         
-        # Intent patterns for routing
+        # Background history summary refreshes, referenced until done so they aren't
+        # garbage collected mid-flight; each opens its own session from session_factory
+        self._background_tasks = set()
+        self._summaries_in_flight = set()  # Conversation IDs with a refresh running
+        self.session_factory = SessionLocal
+        
+        # Intent patterns for routing, compiled once. They are all lowercase and only ever
+        # see lowercased input, so they are compiled without re.IGNORECASE
         self.intent_patterns = {
-            # Educational intents
-            'concept_explanation': [
-                r'what\s+is\s+a?\s*(persona|northstar|north\s*star)',
-                r'explain\s+(persona|northstar|north\s*star)',
-                r'what\s+are\s+(personas|northstars|north\s*stars)',
-                r'help\s+me\s+understand\s+(persona|northstar)',
-                r'meaning\s+of\s+life',
-                r'what.*persona.*mean',
-                r'define\s+(persona|northstar)'
-            ],
-            
-            'examples_request': [
-                r'give\s+me\s+examples?\s+of\s+(persona|northstar)',
-                r'show\s+me\s+examples?\s+of\s+(persona|northstar)',
-                r'examples?\s+of\s+(persona|northstar)',
-                r'can\s+you\s+show\s+me.*examples?'
-            ],
-            
-            # Discovery intents (for future use)
-            'persona_creation': [
-                r'create\s+my\s+(persona|personas)',
-                r'discover\s+my\s+(persona|personas)',
-                r'find\s+my\s+(persona|personas)',
-                r'identify\s+my\s+(persona|personas)',
-                r'ready\s+to\s+(create|discover)',
-                r'let.*s\s+(create|discover|find)\s+my',
-                r'(want\s+to\s+|i\s+want\s+to\s+)?(create|discover|find)\s+(my\s+)?(persona|personas)',
-                r'i\s+want\s+to\s+(create|discover|find)'
-            ],
-            
-            # Refinement intents (for future use)
-            'persona_refinement': [
-                r'improve\s+my\s+.*persona',
-                r'refine\s+my\s+.*persona',
-                r'update\s+my\s+.*persona',
-                r'change\s+my\s+.*persona',
-                r'modify\s+my\s+.*persona',
-                r'better.*persona'
-            ],
-            
-            # Goal intents
-            'goal_setting': [
-                r'set\s+goals?\s+for',
-                r'create\s+goals?\s+for',
-                r'goals?\s+for\s+my\s+.*persona',
-                r'turn.*into\s+goals?',
-                r'actionable\s+steps',
-                r'daily\s+practices'
-            ],
-            
-            # Management intents
-            'overview_request': [
-                r'show\s+me\s+all\s+my\s+(personas|goals)',
-                r'list\s+all\s+my\s+(personas|goals)',
-                r'overview\s+of\s+my\s+(personas|goals)',
-                r'dashboard',
-                r'summary\s+of\s+my',
-                r'all\s+my\s+(personas|goals)'
-            ],
-            
-            'progress_review': [
-                r'how\s+am\s+i\s+doing',
-                r'progress\s+on\s+my',
-                r'review\s+my\s+progress',
-                r'check\s+my\s+progress'
-            ],
-            
-            'strategic_planning': [
-                r'what\s+should\s+i\s+focus\s+on',
-                r'prioritize\s+my',
-                r'strategic\s+planning',
-                r'big\s+picture',
-                r'long\s+term'
-            ],
-            
-            # Affirmative responses
-            'affirmative_response': [
-                r'^yes$',
-                r'^yeah$',
-                r'^yep$',
-                r'^sure$',
-                r'^okay$',
-                r'^ok$',
-                r'yes,?\s+',
-                r'that\s+sounds?\s+good',
-                r'i\s*\'?d\s+like\s+that',
-                r'let\s*\'?s\s+do\s+it',
-                r'sounds?\s+great'
-            ],
-            
-            # Negative responses
-            'negative_response': [
-                r'^no$',
-                r'^nah$',
-                r'^nope$',
-                r'no,?\s+',
-                r'not\s+yet',
-                r'not\s+now',
-                r'maybe\s+later',
-                r'not\s+ready'
-            ]
+            intent: [re.compile(pattern) for pattern in patterns]
+            for intent, patterns in INTENT_PATTERNS.items()
         }
+        # Anchored literals are checked with a set lookup / startswith; the rest of each
+        # intent's patterns form one alternation (None if none are left), so detecting
+        # a hit is at most a single search. Input is lowercased and stripped first.
+        self.intent_exact = {}
+        self.intent_prefixes = {}
+        self.intent_regex = {}
+        # Literal prefilter: an intent's regex only runs if the message contains one of
+        # its patterns' required words (None if some pattern has no such word)
+        self.intent_literals = {}
+        for intent, patterns in INTENT_PATTERNS.items():
+            exact, prefixes, regexes = _partition_patterns(patterns)
+            self.intent_exact[intent] = exact
+            self.intent_prefixes[intent] = prefixes
+            self.intent_regex[intent] = (
+                re.compile("|".join(f"(?:{pattern})" for pattern in regexes)) if regexes else None
+            )
+            literals = [_required_literal(pattern) for pattern in regexes]
+            self.intent_literals[intent] = None if None in literals else tuple(set(literals))
+        
+        # Scan order is priority order: the first matching intent wins, so it can't be
+        # re-sorted by hit frequency without changing routing for messages that match
+        # several intents (e.g. "yes, let's create my personas"). Pre-zip what the
+        # scan needs per intent so the loop does no dict lookups.
+        self._intent_order = tuple(
+            (
+                intent,
+                self.intent_exact[intent],
+                self.intent_prefixes[intent],
+                self.intent_regex[intent],
+                self.intent_literals[intent],
+                self.intent_patterns[intent]
+            )
+            for intent in INTENT_PATTERNS
+        )
+        
+        # Normalized message -> (intent, confidence) or None, oldest first
+        self._intent_cache: Dict[str, Optional[Tuple[str, float]]] = {}
+    
+    @property
+    def agents(self) -> Dict[str, Any]:
+        """All registered agents by type, instantiating any not created yet"""
+        return {agent_type: self._get_agent(agent_type) for agent_type in self._agent_factories}
+    
+    def _get_agent(self, agent_type: str):
+        """Return the agent for agent_type, creating it on first use"""
+        agent = self._agent_instances.get(agent_type)
+        if agent is None:
+            agent = self._agent_factories[agent_type]()
+            self._agent_instances[agent_type] = agent
+        return agent
     
     def analyze_intent(self, message: str, context: Dict[str, Any]) -> Tuple[str, float]:
         """
@@ -153,18 +309,26 @@ class ConversationManager:
         """
         msg = message.lower().strip()
         
+        is_affirmative = msg in AFFIRMATIVE_REPLIES
+        is_negative = not is_affirmative and msg in NEGATIVE_REPLIES
+        
         # Check for explicit agent transitions first
         if context.get('awaiting_transition_confirmation'):
-            if self._matches_patterns(msg, self.intent_patterns['affirmative_response']):
+            if is_affirmative or self._matches_patterns(msg, 'affirmative_response'):
                 return context.get('pending_transition', 'persona_creation'), 0.95
-            elif self._matches_patterns(msg, self.intent_patterns['negative_response']):
+            elif is_negative or self._matches_patterns(msg, 'negative_response'):
                 return 'concept_clarification', 0.90
         
+        # A bare yes/no matches exactly one of its intent's patterns
+        if is_affirmative:
+            return 'affirmative_response', 0.70
+        if is_negative:
+            return 'negative_response', 0.70
+        
         # Check each intent pattern
-        for intent, patterns in self.intent_patterns.items():
-            if self._matches_patterns(msg, patterns):
-                confidence = self._calculate_confidence(msg, patterns)
-                return intent, confidence
+        match = self._match_intent_patterns(msg)
+        if match is not None:
+            return match
         
         # Default intent based on conversation history
         if context.get('conversation_history'):
@@ -173,49 +337,93 @@ class ConversationManager:
         # Fallback to educational
         return 'concept_explanation', 0.50
     
-    def _matches_patterns(self, message: str, patterns: list) -> bool:
-        """Check if message matches any of the regex patterns"""
-        for pattern in patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                return True
-        return False
+    def _match_intent_patterns(self, msg: str) -> Optional[Tuple[str, float]]:
+        """
+        Return (intent, confidence) of the first intent whose patterns match msg, or None.
+        
+        The sweep doesn't depend on context, so results are cached per normalized
+        message (bounded by INTENT_CACHE_SIZE, oldest evicted first).
+        """
+        if msg in self._intent_cache:
+            return self._intent_cache[msg]
+        
+        result = None
+        for intent, exact, prefixes, regex, literals, patterns in self._intent_order:
+            if self._search_intent(msg, exact, prefixes, regex, literals):
+                result = (intent, self._calculate_confidence(msg, patterns))
+                break
+        
+        if len(self._intent_cache) >= INTENT_CACHE_SIZE:
+            del self._intent_cache[next(iter(self._intent_cache))]
+        self._intent_cache[msg] = result
+        return result
+    
+    def _matches_patterns(self, message: str, intent: str) -> bool:
+        """Check if a lowercased, stripped message matches any of the intent's patterns"""
+        return self._search_intent(
+            message,
+            self.intent_exact[intent],
+            self.intent_prefixes[intent],
+            self.intent_regex[intent],
+            self.intent_literals[intent]
+        )
+    
+    @staticmethod
+    def _search_intent(
+        message: str,
+        exact: frozenset,
+        prefixes: Tuple[str, ...],
+        regex: Optional[re.Pattern],
+        literals: Optional[Tuple[str, ...]]
+    ) -> bool:
+        """Exact and prefix literals first, then the regex if the literal prefilter allows it"""
+        if message in exact or (prefixes and message.startswith(prefixes)):
+            return True
+        if regex is None or (literals is not None and not any(literal in message for literal in literals)):
+            return False
+        return regex.search(message) is not None
     
     def _calculate_confidence(self, message: str, patterns: list) -> float:
-        """Calculate confidence score based on pattern matching"""
-        matches = 0
-        for pattern in patterns:
-            if re.search(pattern, message, re.IGNORECASE):
-                matches += 1
+        """
+        Calculate confidence score based on pattern matching.
+        
+        Only run for the intent that matched; message is already lowercased.
+        """
+        matches = sum(1 for pattern in patterns if pattern.search(message))
         
         # Higher confidence for more specific matches
         base_confidence = 0.70
         if matches > 1:
             base_confidence = 0.85
-        if any(word in message.lower() for word in ['persona', 'northstar', 'north star']):
+        if any(word in message for word in ('persona', 'northstar', 'north star')):
             base_confidence += 0.10
             
         return min(base_confidence, 0.95)
     
     def _infer_intent_from_context(self, message: str, context: Dict[str, Any]) -> str:
-        """Infer intent based on conversation history"""
-        history = context.get('conversation_history', [])
+        """Infer intent based on conversation history; message is already lowercased and stripped"""
+        if 'last_agent_text' in context:
+            last_agent_msg = context['last_agent_text']
+        else:
+            # Context not built by _build_session_context (e.g. the analyze-intent endpoint)
+            last_agent_msg = self._last_agent_text(context.get('conversation_history', []))
         
         # If last agent message asked about discovering personas
-        if history:
-            last_agent_msg = None
-            for msg in reversed(history):
-                if msg.get('from') == 'agent':
-                    last_agent_msg = msg.get('text', '')
-                    break
-                    
-            if last_agent_msg and 'discover your own personas' in last_agent_msg.lower():
-                if message.lower().strip() in ['yes', 'yeah', 'sure', 'okay']:
-                    return 'persona_creation'
-                elif message.lower().strip() in ['no', 'not yet', 'maybe later']:
-                    return 'concept_clarification'
+        if last_agent_msg and 'discover your own personas' in last_agent_msg.lower():
+            if message in AFFIRMATIVE_REPLIES:
+                return 'persona_creation'
+            elif message in NEGATIVE_REPLIES:
+                return 'concept_clarification'
         
         return 'concept_explanation'
     
+    def _last_agent_text(self, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Return the text of the most recent agent message, or None"""
+        for msg in reversed(messages):
+            if msg.get('from') == 'agent':
+                return msg.get('text', '')
+        return None
+    
     def select_agent(self, intent: str, context: Dict[str, Any]) -> str:
         """
         Select appropriate agent based on intent.
@@ -250,7 +458,7 @@ class ConversationManager:
         selected_agent = intent_to_agent.get(intent, 'educational')
         
         # Ensure selected agent exists
-        if selected_agent not in self.agents:
+        if selected_agent not in self._agent_factories:
             selected_agent = 'educational'
             
         return selected_agent
@@ -270,93 +478,227 @@ class ConversationManager:
         Returns:
             Conversation response with agent output
         """
-        try:
-            # Check for forced agent first - determine target agent type
-            forced_agent = request.agent_context.get('force_agent_type') if request.agent_context else None
+        conversation, agent, context, previous_agent = await self._start_turn(request, db)
+        
+        response = await agent.process_message(request.message, context)
+        
+        return await self._finish_turn(conversation, agent, context, previous_agent, request, response, db)
+    
+    async def process_message_stream(
+        self,
+        request: ConversationRequest,
+        db: Session
+    ) -> AsyncIterator[Union[str, ConversationResponse]]:
+        """
+        Streaming variant of process_message.
+        
+        Intent analysis and agent selection run as for process_message; the agent's
+        reply is then streamed (see BaseAgent.process_message_stream) and the
+        conversation is saved once the final response is complete.
+        
+        Args:
+            request: Conversation request
+            db: Database session
             
-            if forced_agent and forced_agent in self.agents:
-                # BYPASS intent analysis - agent is explicitly forced
-                agent_type = forced_agent
-                intent = f"forced_{forced_agent}"
-                confidence = 1.0
-                print(f"⚡ Bypassing intent analysis - forced agent: {forced_agent}")
+        Yields:
+            Text chunks of the reply, followed by the saved ConversationResponse
+        """
+        conversation, agent, context, previous_agent = await self._start_turn(request, db)
+        
+        async for item in agent.process_message_stream(request.message, context):
+            if isinstance(item, ConversationResponse):
+                yield await self._finish_turn(conversation, agent, context, previous_agent, request, item, db)
             else:
-                # For intent analysis, we need basic context, so load current conversation first
-                if request.conversation_id:
-                    current_conversation = db.query(Conversation).filter(
-                        Conversation.id == request.conversation_id
-                    ).first()
-                else:
-                    current_conversation = None
-                
-                # Build minimal context for intent analysis
-                temp_context = self._build_session_context(current_conversation, request, db)
-                
-                # Normal intent analysis and agent selection
-                intent, confidence = self.analyze_intent(request.message, temp_context)
-                agent_type = self.select_agent(intent, temp_context)
-                print(f"🧠 Intent analysis: '{request.message}' → {intent} ({confidence:.2f}) → {agent_type}")
+                yield item
+    
+    async def _start_turn(
+        self,
+        request: ConversationRequest,
+        db: Session
+    ) -> Tuple[Conversation, Any, Dict[str, Any], Optional[str]]:
+        """
+        Pick the agent for a message and build its context.
+        
+        Returns:
+            (conversation the turn belongs to, selected agent, agent context, previous
+            agent type if the turn moved to a new agent's conversation, else None)
+        """
+        # Check for forced agent first - determine target agent type
+        forced_agent = request.agent_context.get('force_agent_type') if request.agent_context else None
+        if forced_agent not in self._agent_factories:
+            forced_agent = None
+        
+        # A forced agent that only reads the current conversation skips the session query
+        lean_context = bool(forced_agent) and not self._get_agent(forced_agent).needs_session_history
+        
+        # One query for the whole session; it serves both context builds below
+        session_conversations = [] if lean_context else self._load_session_conversations(request, db)
+        
+        # Load the current conversation once; it serves both intent analysis and
+        # the transition check (db.get answers from the identity map when the
+        # session query already loaded it)
+        current_conversation = (
+            db.get(Conversation, UUID(request.conversation_id)) if request.conversation_id else None
+        )
+        if lean_context and current_conversation:
+            session_conversations = [current_conversation]
+        
+        if forced_agent:
+            # BYPASS intent analysis - agent is explicitly forced
+            agent_type = forced_agent
+            intent = f"forced_{forced_agent}"
+            confidence = 1.0
+            logger.debug("⚡ Bypassing intent analysis - forced agent: %s", forced_agent)
+        else:
+            # Build minimal context for intent analysis
+            temp_context = self._build_session_context(current_conversation, request, db, session_conversations)
             
-            # Determine if we need a new conversation (agent transition)
-            if request.conversation_id:
-                current_conversation = db.query(Conversation).filter(
-                    Conversation.id == request.conversation_id
-                ).first()
-                
-                if current_conversation and current_conversation.agent_type != agent_type:
-                    # AGENT TRANSITION - Create new conversation!
-                    print(f"🔄 Agent transition: {current_conversation.agent_type} → {agent_type}")
-                    conversation = await self._create_new_conversation_for_transition(
-                        current_conversation, agent_type, request, db
-                    )
-                    agent_transitioned = True
-                    previous_agent = current_conversation.agent_type
-                else:
-                    # Continue existing conversation
-                    conversation = current_conversation or await self._create_first_conversation(request, agent_type, db)
-                    agent_transitioned = False
-                    previous_agent = None
+            # Normal intent analysis and agent selection
+            intent, confidence = self.analyze_intent(request.message, temp_context)
+            agent_type = self.select_agent(intent, temp_context)
+            logger.debug("🧠 Intent analysis: '%s' → %s (%.2f) → %s", request.message, intent, confidence, agent_type)
+        
+        # Determine if we need a new conversation (agent transition)
+        if request.conversation_id:
+            if current_conversation and current_conversation.agent_type != agent_type:
+                # AGENT TRANSITION - Create new conversation!
+                logger.debug("🔄 Agent transition: %s → %s", current_conversation.agent_type, agent_type)
+                conversation = await self._create_new_conversation_for_transition(
+                    current_conversation, agent_type, request, db
+                )
+                previous_agent = current_conversation.agent_type
             else:
-                # No conversation_id provided - create first conversation
-                conversation = await self._create_first_conversation(request, agent_type, db)
-                agent_transitioned = False
+                # Continue existing conversation
+                conversation = current_conversation or await self._create_first_conversation(request, agent_type, db)
                 previous_agent = None
+        else:
+            # No conversation_id provided - create first conversation
+            conversation = await self._create_first_conversation(request, agent_type, db)
+            previous_agent = None
+        
+        # Build full context with session history
+        context = self._build_session_context(conversation, request, db, session_conversations)
+        context.update({
+            'detected_intent': intent,
+            'intent_confidence': confidence,
+            'selected_agent': agent_type
+        })
+        
+        # Bulk persona summaries replace the conversational reply, so they only run when the
+        # caller asks for them (agent_context['bulk_personas']), never from intent alone
+        if agent_type == 'management' and request.agent_context and request.agent_context.get('bulk_personas'):
+            context['bulk_personas'] = self._load_bulk_personas(request, db)
+        
+        return conversation, self._get_agent(agent_type), context, previous_agent
+    
+    def _load_bulk_personas(self, request: ConversationRequest, db: Session) -> List[Dict[str, Any]]:
+        """The user's personas, oldest first, as ManagementAgent.summarize_personas takes them"""
+        rows = db.execute(
+            select(Persona.label, Persona.north_star)
+            .where(Persona.user_id == UUID(request.user_id))
+            .order_by(Persona.created_at)
+        ).all()
+        return [{'name': label, 'north_star': north_star} for label, north_star in rows]
+    
+    async def _finish_turn(
+        self,
+        conversation: Conversation,
+        agent,
+        context: Dict[str, Any],
+        previous_agent: Optional[str],
+        request: ConversationRequest,
+        response: ConversationResponse,
+        db: Session
+    ) -> ConversationResponse:
+        """Fill in the turn's intent and transition details on the agent's response and save it"""
+        intent = context['detected_intent']
+        agent_type = context['selected_agent']
+        
+        # Update response with intent and conversation information
+        response.conversation_id = context['conversation_id']
+        response.intent = intent
+        response.intent_confidence = context['intent_confidence']
+        
+        # Set agent transition information if transition occurred
+        if previous_agent:
+            response.agent_transition.occurred = True
+            response.agent_transition.from_agent = previous_agent
+            response.agent_transition.to_agent = agent_type
+            response.agent_transition.reason = f"agent_change_{intent}"
+            response.agent_transition.transition_message = f"Created new conversation (ID: {context['conversation_id']}) for {agent_type} agent based on intent: {intent}"
+        
+        # Save conversation to database
+        await self._save_conversation(conversation, request, response, db)
+        
+        # Fold messages that have left the prompt window into the running summary, after
+        # the reply; later turns pick it up
+        self._schedule_history_summary(agent, request, context)
+        
+        return response
+    
+    def _schedule_history_summary(self, agent, request: ConversationRequest, context: Dict[str, Any]):
+        """Start a history summary refresh in the background when one is due; nothing waits for it"""
+        # The exchange just saved added two messages
+        message_count = (context.get('session_message_count') or len(context.get('conversation_history') or [])) + 2
+        if not history_summary_due(message_count, context.get('history_summary_at') or 0):
+            return
+        # A turn that arrives during a refresh would find it still due; one is enough
+        if context['conversation_id'] in self._summaries_in_flight:
+            return
+        self._summaries_in_flight.add(context['conversation_id'])
+        
+        task = asyncio.create_task(self._refresh_history_summary(
+            agent,
+            request,
+            context['conversation_id'],
+            context.get('history_summary'),
+            context.get('history_summary_at') or 0
+        ))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(lambda _: self._summaries_in_flight.discard(context['conversation_id']))
+    
+    async def _refresh_history_summary(
+        self,
+        agent,
+        request: ConversationRequest,
+        conversation_id: str,
+        history_summary: Optional[str],
+        history_summary_at: int
+    ):
+        """
+        Store a refreshed history summary in the conversation's context_state.
+        
+        Runs after the response, in its own session. The full session history is loaded so
+        everything since the last successful refresh (history_summary_at) is summarized,
+        even if refreshes in between failed. The summary is bookkeeping for later prompts,
+        so a failure is logged and ignored.
+        """
+        db = self.session_factory()
+        try:
+            conversation = db.get(Conversation, UUID(conversation_id))
+            conversations = self._load_session_conversations(request, db)
+            if conversation not in conversations:
+                conversations.append(conversation)
+            history = [message for conv in conversations for message in conv.messages or []]
             
-            # Build full context with session history
-            context = self._build_session_context(conversation, request, db)
-            context.update({
-                'detected_intent': intent,
-                'intent_confidence': confidence,
-                'selected_agent': agent_type
+            refreshed = await agent.summarize_history({
+                'session_history': history,
+                'history_summary': history_summary,
+                'history_summary_at': history_summary_at
             })
-            
-            # Process message with selected agent
-            agent = self.agents[agent_type]
-            response = await agent.process_message(request.message, context)
-            
-            # Update response with intent and conversation information
-            response.conversation_id = str(conversation.id)
-            response.intent = intent
-            response.intent_confidence = confidence
-            
-            # Set agent transition information if transition occurred
-            if agent_transitioned:
-                response.agent_transition.occurred = True
-                response.agent_transition.from_agent = previous_agent
-                response.agent_transition.to_agent = agent_type
-                response.agent_transition.reason = f"agent_change_{intent}"
-                response.agent_transition.transition_message = f"Created new conversation (ID: {conversation.id}) for {agent_type} agent based on intent: {intent}"
-            
-            # Handle explicit agent transitions if needed (from AI commands)
-            response = await self._handle_agent_transitions(response, context, db)
-            
-            # Save conversation to database
-            await self._save_conversation(conversation, request, response, db)
-            
-            return response
-            
-        except Exception as e:
-            raise Exception(f"ConversationManager error: {str(e)}")
+            if not refreshed:
+                return
+            # Merged in SQL (jsonb ||), apart from the user-facing conversation_summary
+            conversation.context_state = func.coalesce(Conversation.context_state, cast({}, JSONB)).op('||')(
+                cast({'history_summary': refreshed, 'history_summary_at': len(history)}, JSONB)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning("History summary refresh failed for conversation %s", conversation_id, exc_info=True)
+        finally:
+            db.close()
     
     async def _load_or_create_conversation(
         self, 
@@ -409,7 +751,7 @@ class ConversationManager:
         db.add(conversation)
         db.commit()
         db.refresh(conversation)
-        print(f"📝 Created first conversation (ID: {conversation.id}) for {agent_type} agent")
+        logger.debug("📝 Created first conversation (ID: %s) for %s agent", conversation.id, agent_type)
         return conversation
     
     async def _create_new_conversation_for_transition(
@@ -435,27 +777,66 @@ class ConversationManager:
         db.add(conversation)
         db.commit()
         db.refresh(conversation)
-        print(f"🆕 Created new conversation (ID: {conversation.id}) for agent transition: {previous_conversation.agent_type} → {new_agent_type}")
+        logger.debug(
+            "🆕 Created new conversation (ID: %s) for agent transition: %s → %s",
+            conversation.id, previous_conversation.agent_type, new_agent_type
+        )
         return conversation
     
-    def _build_session_context(self, current_conversation: Conversation, request: ConversationRequest, db: Session) -> Dict[str, Any]:
-        """Build context dictionary with full session history for agents"""
-        # Get all conversations in this session for full context
-        session_conversations = []
-        if request.session_id:
-            all_conversations = db.query(Conversation).filter(
-                Conversation.session_id == request.session_id,
-                Conversation.user_id == request.user_id
-            ).order_by(Conversation.started_at).all()
-            
-            # Build full session message history
-            for conv in all_conversations:
-                if conv.messages:
-                    session_conversations.extend(conv.messages)
+    def _load_session_conversations(self, request: ConversationRequest, db: Session) -> List[Conversation]:
+        """Load all conversations in the request's session, oldest first (empty without a session)"""
+        if not request.session_id:
+            return []
+        return db.query(Conversation).filter(
+            Conversation.session_id == request.session_id,
+            Conversation.user_id == request.user_id
+        ).order_by(Conversation.started_at).all()
+    
+    def _build_session_context(
+        self,
+        current_conversation: Conversation,
+        request: ConversationRequest,
+        db: Session,
+        all_conversations: Optional[List[Conversation]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build context dictionary with full session history for agents.
+        
+        all_conversations is the result of _load_session_conversations, if the
+        caller already has it; otherwise the session is queried here.
+        """
+        if all_conversations is None:
+            all_conversations = self._load_session_conversations(request, db)
+        
+        # Collect the last SESSION_HISTORY_LIMIT session messages, newest conversation first
+        recent_message_lists = []
+        collected = 0
+        session_message_count = 0
+        # Summary of messages older than the prompt window, with the message count it was
+        # refreshed at (latest in the session wins)
+        summary_state = None
+        for conv in reversed(all_conversations):
+            if conv.messages:
+                session_message_count += len(conv.messages)
+                if collected < SESSION_HISTORY_LIMIT:
+                    recent_message_lists.append(conv.messages)
+                    collected += len(conv.messages)
+            if summary_state is None and conv.context_state and conv.context_state.get('history_summary'):
+                summary_state = conv.context_state
+        if summary_state is None and current_conversation and current_conversation.context_state:
+            summary_state = current_conversation.context_state
+        summary_state = summary_state or {}
+        
+        session_conversations = [
+            message for messages in reversed(recent_message_lists) for message in messages
+        ][-SESSION_HISTORY_LIMIT:]
         
         # Current conversation messages (if any)
         current_messages = current_conversation.messages if current_conversation else []
         
+        # Text of the latest agent message, for intent inference on short replies
+        last_agent_text = self._last_agent_text(current_messages)
+        
         return {
             'conversation_id': str(current_conversation.id) if current_conversation else None,
             'session_id': request.session_id,
@@ -463,32 +844,17 @@ class ConversationManager:
             'target_persona_id': request.target_persona_id,
             'target_goal_id': request.target_goal_id,
             'conversation_history': current_messages,  # Current conversation only
-            'session_history': session_conversations,   # Full session across all conversations
+            'last_agent_text': last_agent_text,
+            'session_history': session_conversations,   # Recent session messages across all conversations
+            'session_message_count': session_message_count,
+            'history_summary': summary_state.get('history_summary'),
+            'history_summary_at': summary_state.get('history_summary_at', 0),
             'temporary_state': request.agent_context.get('temporary_state', {}) if request.agent_context else {},
             'current_agent_type': current_conversation.agent_type if current_conversation else None,
-            'requested_agent': request.agent_context.get('force_agent_type') if request.agent_context else None
+            'requested_agent': request.agent_context.get('force_agent_type') if request.agent_context else None,
+            'no_cache': bool(request.agent_context.get('no_cache')) if request.agent_context else False
         }
     
-    async def _handle_agent_transitions(
-        self, 
-        response: ConversationResponse, 
-        context: Dict[str, Any], 
-        db: Session
-    ) -> ConversationResponse:
-        """Handle agent transitions and route to new agents if needed"""
-        
-        if response.agent_transition.occurred:
-            target_agent = response.agent_transition.to_agent
-            
-            # For now, only educational agent is available
-            # In Step 7, we'll actually transition to other agents
-            if target_agent not in self.agents:
-                # Add note that transition would occur when agent is available
-                response.agent_transition.transition_message += f" (Note: {target_agent} agent will be available soon)"
-                response.agent_transition.occurred = False  # Don't actually transition yet
-        
-        return response
-    
     async def _save_conversation(
         self, 
         conversation: Conversation, 
@@ -501,32 +867,30 @@ class ConversationManager:
         # Process database changes first (personas, goals, etc.)
         await self._process_database_changes(response.database_changes, request.user_id, db)
         
-        # Update messages
-        updated_messages = conversation.messages or []
+        # One timestamp for the whole exchange
+        now = datetime.utcnow()
+        now_iso = now.isoformat()
         
-        # Add user message
         user_message = {
-            'id': f"msg-{datetime.utcnow().timestamp()}-user",
+            'id': f"msg-{uuid4().hex}-user",
             'from': 'user',
             'text': request.message,
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': now_iso,
             'agent_type': response.agent_type
         }
-        updated_messages.append(user_message)
-        
-        # Add agent response
         agent_message = {
-            'id': f"msg-{datetime.utcnow().timestamp()}-agent",
+            'id': f"msg-{uuid4().hex}-agent",
             'from': 'agent', 
             'text': response.user_response,
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': now_iso,
             'agent_type': response.agent_type
         }
-        updated_messages.append(agent_message)
         
-        # Update conversation
-        conversation.messages = updated_messages
-        conversation.last_activity_at = datetime.utcnow()
+        # Append both messages in SQL (jsonb ||) rather than rewriting the whole messages array
+        conversation.messages = func.coalesce(Conversation.messages, cast([], JSONB)).op('||')(
+            cast([user_message, agent_message], JSONB)
+        )
+        conversation.last_activity_at = now
         conversation.agent_type = response.agent_type
         if response.intent:
             conversation.intent = response.intent
@@ -536,73 +900,89 @@ class ConversationManager:
     
     async def _process_database_changes(
         self,
-        database_changes: 'DatabaseChanges',
+        database_changes: DatabaseChanges,
         user_id: str,
         db: Session
     ):
         """Process database changes from agent responses (create personas, goals, etc.)"""
-        from models import Persona, Goal
-        from uuid import UUID
-        
-        # Create personas
-        if database_changes and database_changes.personas_created:
-            for persona_action in database_changes.personas_created:
-                print(f"🆕 Creating persona: {persona_action.get('name')} | {persona_action.get('north_star')}")
-                
-                # Create new persona record
-                new_persona = Persona(
-                    user_id=UUID(user_id),
-                    label=persona_action.get('name'),
-                    north_star=persona_action.get('north_star'),
-                    is_calling=False,  # Default value
-                    importance=3  # Default importance
-                )
-                
-                db.add(new_persona)
-                print(f"✅ Added persona '{new_persona.label}' to database session")
-        
-        # Create goals  
-        if database_changes and database_changes.goals_created:
-            for goal_action in database_changes.goals_created:
-                print(f"🎯 Creating goal: {goal_action.get('name')}")
-                
-                # Create new goal record
-                new_goal = Goal(
-                    user_id=UUID(user_id),
-                    name=goal_action.get('name'),
-                    acceptance_criteria=goal_action.get('acceptance_criteria'),
-                    review_date=datetime.utcnow(),  # Default to now, can be refined later
-                    planned_hours=0,
-                    actual_hours=0
-                )
-                
-                db.add(new_goal)
-                print(f"✅ Added goal '{new_goal.name}' to database session")
+        if not database_changes or not (database_changes.personas_created or database_changes.goals_created):
+            return
+        
+        uid = UUID(user_id)
+        
+        # Create personas - one multi-row INSERT for all of them
+        if database_changes.personas_created:
+            personas = [
+                {
+                    'user_id': uid,
+                    'label': persona_action.get('name'),
+                    'north_star': persona_action.get('north_star'),
+                    'is_calling': False,  # Default value
+                    'importance': 3  # Default importance
+                }
+                for persona_action in database_changes.personas_created
+            ]
+            if logger.isEnabledFor(logging.DEBUG):
+                for persona in personas:
+                    logger.debug("🆕 Creating persona: %s | %s", persona['label'], persona['north_star'])
+            db.execute(insert(Persona), personas)
+            logger.debug("✅ Added %d persona(s) to database session", len(personas))
+        
+        # Create goals - one multi-row INSERT for all of them
+        if database_changes.goals_created:
+            review_date = datetime.utcnow()  # Default to now, can be refined later
+            goals = [
+                {
+                    'user_id': uid,
+                    'name': goal_action.get('name'),
+                    'acceptance_criteria': goal_action.get('acceptance_criteria'),
+                    'review_date': review_date,
+                    'planned_hours': 0,
+                    'actual_hours': 0
+                }
+                for goal_action in database_changes.goals_created
+            ]
+            if logger.isEnabledFor(logging.DEBUG):
+                for goal in goals:
+                    logger.debug("🎯 Creating goal: %s", goal['name'])
+            db.execute(insert(Goal), goals)
+            logger.debug("✅ Added %d goal(s) to database session", len(goals))
         
         # Commit database changes
-        if (database_changes and 
-            (database_changes.personas_created or database_changes.goals_created)):
-            print("💾 Committing database changes...")
-            db.commit()
-            print("✅ Database changes committed successfully")
+        logger.debug("💾 Committing database changes...")
+        db.commit()
+        logger.debug("✅ Database changes committed successfully")
     
     def _generate_uuid(self) -> str:
         """Generate a new UUID"""
-        from uuid import uuid4
         return str(uuid4())
     
     def get_available_agents(self) -> list:
         """Return list of available agent types"""
-        return list(self.agents.keys())
+        return list(self._agent_factories)
     
     def get_agent_info(self, agent_type: str) -> Dict[str, Any]:
         """Get information about a specific agent"""
-        if agent_type not in self.agents:
+        if agent_type not in self._agent_factories:
             raise ValueError(f"Agent type {agent_type} not found")
             
-        agent = self.agents[agent_type]
+        agent = self._get_agent(agent_type)
         return {
             'type': agent.agent_type,
             'display_name': agent.display_name,
             'supported_intents': agent.get_supported_intents()
-        }
\ No newline at end of file
+        }
+
+
+@lru_cache(maxsize=1)
+def get_conversation_manager() -> ConversationManager:
+    """
+    Return the process-wide ConversationManager, creating it on first use.
+    
+    The manager keeps no per-request state, so one instance (with its compiled
+    intent patterns and agents) is shared by every request.
+    
+    Returns:
+        Shared ConversationManager
+    """
+    return ConversationManager()
@@ -1,7 +1,8 @@
 # conversation_models.py - Pydantic models for conversation API
 
+from dataclasses import dataclass
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from enum import Enum
 from datetime import datetime
 from uuid import UUID
@@ -16,6 +17,10 @@ class AgentType(str, Enum):
     GOAL = "goal"
 
 
+# AgentType values as a Literal, so model fields check them with a single set lookup
+AgentTypeName = Literal["educational", "discovery", "refinement", "management", "goal"]
+
+
 class ConversationRequest(BaseModel):
     """Request model for conversation processing"""
     user_id: str = Field(..., description="UUID of the user")
@@ -61,8 +66,8 @@ class DatabaseChanges(BaseModel):
 class AgentTransition(BaseModel):
     """Information about agent transitions during conversation"""
     occurred: bool = Field(..., description="Whether a transition occurred")
-    from_agent: Optional[str] = Field(None, description="Previous agent type")
-    to_agent: Optional[str] = Field(None, description="New agent type")
+    from_agent: Optional[AgentTypeName] = Field(None, description="Previous agent type")
+    to_agent: Optional[AgentTypeName] = Field(None, description="New agent type")
     reason: Optional[str] = Field(None, description="Reason for transition: user_intent_change, explicit_request, action_triggered")
     suggested_route: Optional[str] = Field(None, description="Suggested frontend route for navigation")
     transition_message: Optional[str] = Field(None, description="Message explaining the transition to user")
@@ -71,7 +76,7 @@ class AgentTransition(BaseModel):
 
 class ContextUpdates(BaseModel):
     """Updates to conversation context"""
-    current_agent_type: Optional[str] = Field(None, description="Current agent handling conversation")
+    current_agent_type: Optional[AgentTypeName] = Field(None, description="Current agent handling conversation")
     target_persona_id: Optional[str] = Field(None, description="Target persona ID if set")
     target_goal_id: Optional[str] = Field(None, description="Target goal ID if set")
     temporary_state: Optional[Dict[str, Any]] = Field(None, description="Agent-specific temporary state")
@@ -79,17 +84,21 @@ class ContextUpdates(BaseModel):
     intent_confidence: Optional[float] = Field(None, description="Confidence score for intent detection")
 
 
+# Shared "no transition" value, copied for each response that doesn't set its own
+_NO_TRANSITION = AgentTransition(occurred=False)
+
+
 class ConversationResponse(BaseModel):
     """Response model for conversation processing"""
     conversation_id: str = Field(..., description="ID of the conversation")
     session_id: Optional[str] = Field(None, description="Session ID grouping related conversations")
-    agent_type: str = Field(..., description="Agent type that handled this message")
-    previous_agent_type: Optional[str] = Field(None, description="Previous agent type if transition occurred")
+    agent_type: AgentTypeName = Field(..., description="Agent type that handled this message")
+    previous_agent_type: Optional[AgentTypeName] = Field(None, description="Previous agent type if transition occurred")
     intent: Optional[str] = Field(None, description="Detected user intent")
     intent_confidence: float = Field(0.0, description="Confidence score for intent detection")
     user_response: str = Field(..., description="Response message for the user")
     database_changes: DatabaseChanges = Field(default_factory=DatabaseChanges, description="Database changes made")
-    agent_transition: AgentTransition = Field(default_factory=lambda: AgentTransition(occurred=False), description="Agent transition information")
+    agent_transition: AgentTransition = Field(default_factory=_NO_TRANSITION.model_copy, description="Agent transition information")
     context_updates: ContextUpdates = Field(default_factory=ContextUpdates, description="Context updates")
 
 
@@ -99,7 +108,7 @@ class ConversationContext(BaseModel):
     """Current conversation context"""
     conversation_id: str
     session_id: Optional[str] = None
-    current_agent_type: str
+    current_agent_type: AgentTypeName
     target_persona_id: Optional[str] = None
     target_goal_id: Optional[str] = None
     temporary_state: Dict[str, Any] = Field(default_factory=dict)
@@ -110,7 +119,7 @@ class ConversationContext(BaseModel):
 
 class ContextUpdate(BaseModel):
     """Update conversation context"""
-    current_agent_type: Optional[str] = None
+    current_agent_type: Optional[AgentTypeName] = None
     target_persona_id: Optional[str] = None
     target_goal_id: Optional[str] = None
     temporary_state: Optional[Dict[str, Any]] = None
@@ -119,7 +128,7 @@ class ContextUpdate(BaseModel):
 class SetTargetPersonaRequest(BaseModel):
     """Request to set target persona for conversation"""
     persona_id: str = Field(..., description="UUID of the persona to target")
-    agent_type: str = Field(..., description="Agent type to switch to (refinement or goal)")
+    agent_type: AgentTypeName = Field(..., description="Agent type to switch to (refinement or goal)")
 
 
 class IntentAnalysisRequest(BaseModel):
@@ -136,13 +145,16 @@ class IntentAnalysisResponse(BaseModel):
     reasoning: str = Field(..., description="Explanation of why this intent was detected")
 
 
-class ConversationMessage(BaseModel):
-    """Individual conversation message"""
+@dataclass(frozen=True)
+class ConversationMessage:
+    """Individual conversation message (immutable, slotted - history responses hold many)"""
+    __slots__ = ('id', 'from_user', 'text', 'timestamp', 'agent_type')
+    
     id: str
     from_user: str  # 'user' or 'agent'
     text: str
     timestamp: datetime
-    agent_type: str
+    agent_type: AgentTypeName
 
 
 class ConversationHistory(BaseModel):
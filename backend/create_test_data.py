@@ -8,10 +8,12 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from db import SessionLocal, init_db
 from models import User, Persona, Goal
 from datetime import datetime, date, timedelta
+from uuid import uuid4
 
 def create_test_data():
     """Create comprehensive test data for dashboard"""
@@ -29,16 +31,15 @@ def create_test_data():
             db.query(Goal).filter_by(user_id=existing_user.id).delete()
             db.query(Persona).filter_by(user_id=existing_user.id).delete()
             db.query(User).filter_by(id=existing_user.id).delete()
-            db.commit()
         
-        # Create test user
+        # Create test user (ids are generated client-side, so nothing is flushed
+        # until the single commit at the end)
         user = User(
+            id=uuid4(),
             name="Sarah Chen",
             email="sarah@dashboard-test.com"
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
         print(f"✅ Created user: {user.name} (ID: {user.id})")
         
         # Create test personas with varying importance
@@ -84,43 +85,53 @@ def create_test_data():
             }
         ]
         
-        # Create personas and goals
+        # Create personas and goals as plain row mappings - one multi-row INSERT per
+        # table, with persona ids generated up front so goals reference them directly
+        review_date = datetime.now() + timedelta(days=7)  # Next week
+        persona_rows = []
+        goal_rows = []
         for persona_data in personas_data:
-            persona = Persona(
-                user_id=user.id,
-                label=persona_data['label'],
-                north_star=persona_data['north_star'],
-                importance=persona_data['importance']
-            )
-            db.add(persona)
-            db.commit()
-            db.refresh(persona)
-            
-            print(f"✅ Created persona: {persona.label} (importance: {persona.importance})")
+            persona_id = uuid4()
+            persona_rows.append({
+                'id': persona_id,
+                'user_id': user.id,
+                'label': persona_data['label'],
+                'north_star': persona_data['north_star'],
+                'importance': persona_data['importance']
+            })
             
             # Create goals for this persona
-            for goal_data in persona_data['goals']:
-                goal = Goal(
-                    user_id=user.id,
-                    persona_id=persona.id,
-                    name=goal_data['name'],
-                    planned_hours=goal_data['planned'],
-                    actual_hours=goal_data['actual'],
-                    success_percentage=goal_data['progress'],
-                    review_date=datetime.now() + timedelta(days=7),  # Next week
-                    status='active'
-                )
-                db.add(goal)
+            goal_rows.extend(
+                {
+                    'user_id': user.id,
+                    'persona_id': persona_id,
+                    'name': goal_data['name'],
+                    'planned_hours': goal_data['planned'],
+                    'actual_hours': goal_data['actual'],
+                    'success_percentage': goal_data['progress'],
+                    'review_date': review_date,
+                    'status': 'active'
+                }
+                for goal_data in persona_data['goals']
+            )
             
-            db.commit()
+            print(f"✅ Created persona: {persona_data['label']} (importance: {persona_data['importance']})")
             print(f"  └─ Added {len(persona_data['goals'])} goals")
         
+        # Executing the inserts autoflushes the pending user first
+        db.execute(insert(Persona), persona_rows)
+        db.execute(insert(Goal), goal_rows)
+        
+        # One commit for the cleanup, user, personas and goals
+        user_id = user.id
+        db.commit()
+        
         print(f"\n🎉 Test data created successfully!")
         print(f"📊 Dashboard URL: http://localhost:3000/dashboard")
-        print(f"👤 User ID for API testing: {user.id}")
-        print(f"🔗 API endpoint: http://localhost:8000/users/{user.id}/dashboard")
+        print(f"👤 User ID for API testing: {user_id}")
+        print(f"🔗 API endpoint: http://localhost:8000/users/{user_id}/dashboard")
         
-        return user.id
+        return user_id
         
     except Exception as e:
         print(f"❌ Error creating test data: {e}")
@@ -9,17 +9,12 @@ from fastapi import FastAPI, HTTPException, Depends, Request
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 
-from db import SessionLocal, init_db
+from db import SessionLocal
 from models import MagicLink, User  # You need to define MagicLink in your models.py
 
 from fastapi import APIRouter
 router = APIRouter()
 
-# Create magic link table on startup
-@router.on_event("startup")
-def startup():
-    init_db()
-
 # Dependency
 
 def get_db():
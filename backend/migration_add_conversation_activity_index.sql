@@ -0,0 +1,21 @@
+-- Migration: Index for paging a user's conversations by recent activity
+-- Run this to add the index to an existing database
+
+-- The keyset cursor compares (last_activity_at, id) rows, which skips NULLs, so backfill
+-- missing activity times from the start time and forbid NULLs from now on
+UPDATE conversations
+SET last_activity_at = COALESCE(started_at, NOW())
+WHERE last_activity_at IS NULL;
+
+ALTER TABLE conversations
+ALTER COLUMN last_activity_at SET NOT NULL;
+
+-- User's conversation list ordered by (last_activity_at, id) DESC and its keyset cursor;
+-- the user_id prefix also serves plain user lookups, replacing the single-column index
+CREATE INDEX IF NOT EXISTS ix_conversations_user_activity
+ON conversations (user_id, last_activity_at, id);
+
+DROP INDEX IF EXISTS ix_conversations_user_id;
+
+-- Verify the changes
+\d conversations;
@@ -0,0 +1,20 @@
+-- Migration: Full-text search column for conversation search
+-- Run this to add the search column and its index to an existing database
+
+-- array_to_string is only STABLE; generated columns need an IMMUTABLE expression
+CREATE OR REPLACE FUNCTION conversation_tags_text(varchar[]) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$ SELECT array_to_string($1, ' ') $$;
+
+-- Search document over topic, tags and summary, maintained by Postgres
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+    to_tsvector('english', coalesce(topic, '') || ' ' || coalesce(conversation_tags_text(tags), '')
+        || ' ' || coalesce(conversation_summary, ''))
+) STORED;
+
+-- search_conversations: search_tsv @@ plainto_tsquery(...)
+CREATE INDEX IF NOT EXISTS ix_conversations_search_tsv
+ON conversations USING GIN (search_tsv);
+
+-- Verify the changes
+\d conversations;
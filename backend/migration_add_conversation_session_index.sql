@@ -0,0 +1,9 @@
+-- Migration: Index conversations for session history lookups
+-- Run this to add the index to an existing database
+
+-- Conversation manager loads all of a user's conversations in a session, ordered by start time
+CREATE INDEX IF NOT EXISTS ix_conversations_session_user_started
+ON conversations (session_id, user_id, started_at);
+
+-- Verify the changes
+\d conversations;
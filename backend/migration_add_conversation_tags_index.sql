@@ -0,0 +1,9 @@
+-- Migration: GIN index on conversation tags
+-- Run this to add the index to an existing database
+
+-- Tag filter on the conversation list (tags @> ARRAY[tag])
+CREATE INDEX IF NOT EXISTS ix_conversations_tags
+ON conversations USING GIN (tags);
+
+-- Verify the changes
+\d conversations;
@@ -0,0 +1,12 @@
+-- Migration: Composite index for the goals-due-for-review lookup
+-- Run this to add the index to an existing database
+
+-- User's goals filtered by status and review date; its user_id prefix also serves
+-- plain user.goals lookups, so the single-column index is no longer needed
+CREATE INDEX IF NOT EXISTS ix_goals_user_status_review
+ON goals (user_id, status, review_date);
+
+DROP INDEX IF EXISTS ix_goals_user_id;
+
+-- Verify the changes
+\d goals;
@@ -0,0 +1,22 @@
+-- Migration: Index foreign key and lookup columns
+-- Run this to add the indexes to an existing database
+
+-- User's personas (user.personas) and the delete-persona-by-label lookup
+CREATE INDEX IF NOT EXISTS ix_personas_user_label
+ON personas (user_id, label);
+
+-- User's goals (user.goals, due goals, dashboard) and a persona's goals
+CREATE INDEX IF NOT EXISTS ix_goals_user_id
+ON goals (user_id);
+
+CREATE INDEX IF NOT EXISTS ix_goals_persona_id
+ON goals (persona_id);
+
+-- User's conversation list and search endpoints
+CREATE INDEX IF NOT EXISTS ix_conversations_user_id
+ON conversations (user_id);
+
+-- Verify the changes
+\d personas;
+\d goals;
+\d conversations;
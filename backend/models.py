@@ -1,11 +1,10 @@
 # models.py
 
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer, Float
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer, Float, Index, Computed, DDL, event
+from sqlalchemy.orm import declarative_base, relationship, deferred
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.dialects.postgresql import JSONB, ARRAY
-import uuid
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY, TSVECTOR
 from uuid import uuid4
 
 
@@ -54,11 +53,45 @@ class Conversation(Base):
     
     # Timing
     started_at = Column(DateTime, default=datetime.utcnow)
-    last_activity_at = Column(DateTime, default=datetime.utcnow)
+    last_activity_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # NOT NULL: list order and keyset cursor
     ended_at = Column(DateTime)
     
+    # Full-text search document over topic, tags and summary, kept up to date by Postgres.
+    # Deferred so it is never loaded (or serialized) with the conversation
+    search_tsv = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('english', coalesce(topic, '') || ' ' || coalesce(conversation_tags_text(tags), '')"
+            " || ' ' || coalesce(conversation_summary, ''))",
+            persisted=True
+        )
+    ))
+    
     user = relationship("User", back_populates="conversations")
     #persona = relationship("Persona", back_populates="conversations")
+    
+    __table_args__ = (
+        # Session history lookup: all of a user's conversations in a session, oldest first
+        Index('ix_conversations_session_user_started', 'session_id', 'user_id', 'started_at'),
+        # User's conversation list, most recent first, and its keyset pagination
+        Index('ix_conversations_user_activity', 'user_id', 'last_activity_at', 'id'),
+        # Tag filter (tags @> ARRAY[tag])
+        Index('ix_conversations_tags', 'tags', postgresql_using='gin'),
+        # Conversation search (search_tsv @@ query)
+        Index('ix_conversations_search_tsv', 'search_tsv', postgresql_using='gin'),
+    )
+
+
+# array_to_string is only STABLE, so the generated search column reads tags through this
+# IMMUTABLE wrapper; created ahead of the conversations table
+event.listen(
+    Conversation.__table__,
+    'before_create',
+    DDL(
+        "CREATE OR REPLACE FUNCTION conversation_tags_text(varchar[]) RETURNS text "
+        "LANGUAGE sql IMMUTABLE AS $$ SELECT array_to_string($1, ' ') $$"
+    )
+)
 
 
 class Persona(Base):
@@ -78,6 +111,11 @@ class Persona(Base):
     
     user = relationship("User", back_populates="personas")
     goals = relationship("Goal", back_populates="persona")
+    
+    __table_args__ = (
+        # User's personas (user.personas) and the delete-by-label lookup
+        Index('ix_personas_user_label', 'user_id', 'label'),
+    )
 
 
 class MagicLink(Base):
@@ -97,7 +135,7 @@ class Goal(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
-    persona_id = Column(UUID(as_uuid=True), ForeignKey('personas.id'), nullable=True)
+    persona_id = Column(UUID(as_uuid=True), ForeignKey('personas.id'), nullable=True, index=True)
     
     # Core goal fields
     name = Column(String, nullable=False)
@@ -121,4 +159,9 @@ class Goal(Base):
     # Relationships
     user = relationship("User", back_populates="goals")
     persona = relationship("Persona", back_populates="goals")
+    
+    __table_args__ = (
+        # User's goals (user.goals, dashboard) and the due-for-review lookup
+        Index('ix_goals_user_status_review', 'user_id', 'status', 'review_date'),
+    )
 
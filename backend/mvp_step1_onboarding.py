@@ -1,32 +1,42 @@
 # Fixed FastAPI Backend - mvp_step1_onboarding.py
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from db import SessionLocal, init_db
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import all_, bindparam, cast, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, load_only, selectinload
+from db import SessionLocal
 from models import User, Persona, Conversation, Goal
 from conversation_models import ConversationRequest, ConversationResponse, DatabaseChanges, AgentTransition, ContextUpdates
-from conversation_manager import ConversationManager
+from conversation_manager import ConversationManager, get_conversation_manager
+import base64
+import json
+import os
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID, uuid4
 from sqlalchemy.exc import IntegrityError
+from email_magic_link_auth import router as auth_router
+
+# Browser origins allowed to call the API, comma-separated in CORS_ORIGINS
+CORS_ORIGINS = tuple(
+    origin.strip() for origin in os.getenv('CORS_ORIGINS', 'http://localhost:3000').split(',') if origin.strip()
+)
 
 app = FastAPI()
 
+# Added before any other middleware so it stays outermost and answers preflight
+# OPTIONS requests itself, without reaching routing or opening a DB session
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-def startup():
-    init_db()
-
 def get_db():
     db = SessionLocal()
     try:
@@ -34,6 +44,51 @@ def get_db():
     finally:
         db.close()
 
+def _user_exists(db: Session, user_id) -> bool:
+    """Check a user exists without loading the User row.
+    
+    Hits are remembered in the session's info dict, so repeat checks within a request
+    (one session per request, see get_db) don't query again.
+    """
+    known_users = db.info.setdefault('existing_user_ids', set())
+    key = str(user_id)
+    if key in known_users:
+        return True
+    
+    exists = db.query(User.id).filter(User.id == user_id).first() is not None
+    if exists:
+        known_users.add(key)
+    return exists
+
+def _commit_returning(db: Session, statement):
+    """Run an INSERT/UPDATE ... RETURNING <model> and commit, returning the row (or None).
+    
+    The returned instance holds every column as written, so there is no add/commit/refresh
+    round trip; it is detached before the commit so the commit doesn't expire it.
+    """
+    obj = db.scalars(statement).one_or_none()
+    if obj is not None:
+        db.expunge(obj)
+        db.commit()
+    return obj
+
+# SQLSTATE for foreign_key_violation
+_FOREIGN_KEY_VIOLATION = '23503'
+
+def _commit_user_owned(db: Session, statement):
+    """Run an INSERT ... RETURNING for a row that references its user, and commit it.
+    
+    The users foreign key doubles as the existence check, so there is no SELECT up front:
+    a violation means the user is missing and becomes a 404.
+    """
+    try:
+        return _commit_returning(db, statement)
+    except IntegrityError as e:
+        db.rollback()
+        if getattr(e.orig, 'pgcode', None) == _FOREIGN_KEY_VIOLATION:
+            raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=400, detail="Database constraint violation")
+
 # Pydantic schemas
 class UserCreate(BaseModel):
     name: str
@@ -80,11 +135,9 @@ class GoalUpdate(BaseModel):
 @app.post("/users/")
 def create_user(user: UserCreate, db: Session = Depends(get_db)):
     try:
-        db_user = User(name=user.name, email=user.email)
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+        return _commit_returning(
+            db, insert(User).values(name=user.name, email=user.email).returning(User)
+        )
     except IntegrityError as e:
         db.rollback()
         if "email" in str(e.orig):
@@ -108,28 +161,19 @@ def get_user(user_id: UUID, db: Session = Depends(get_db)):
 @app.post("/personas/")
 def create_persona(persona: PersonaCreate, db: Session = Depends(get_db)):
     """Create a new persona"""
-    db_user = db.get(User, persona.user_id)
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    db_persona = Persona(
+    return _commit_user_owned(db, insert(Persona).values(
         user_id=persona.user_id,
         label=persona.label,
         north_star=persona.north_star,
         is_calling=persona.is_calling
-    )
-    db.add(db_persona)
-    db.commit()
-    db.refresh(db_persona)
-    return db_persona
+    ).returning(Persona))
 
 @app.get("/users/{user_id}/personas")
 def list_user_personas(user_id: UUID, db: Session = Depends(get_db)):
     """Get all personas for a specific user"""
-    user = db.get(User, user_id)
-    if not user:
+    if not _user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    return user.personas
+    return db.query(Persona).filter_by(user_id=user_id).all()
 
 @app.get("/personas/{persona_id}")
 def get_persona(persona_id: UUID, db: Session = Depends(get_db)):
@@ -142,49 +186,63 @@ def get_persona(persona_id: UUID, db: Session = Depends(get_db)):
 @app.put("/personas/{persona_id}")
 def update_persona(persona_id: UUID, persona_update: PersonaUpdate, db: Session = Depends(get_db)):
     """Update an existing persona"""
-    persona = db.get(Persona, persona_id)
+    # Update only the fields that were provided (non-null)
+    values = persona_update.model_dump(exclude_none=True)
+    values['updated_at'] = datetime.utcnow()
+    
+    # One UPDATE ... RETURNING instead of SELECT, UPDATE and a refresh SELECT
+    persona = _commit_returning(
+        db, update(Persona).where(Persona.id == persona_id).values(**values).returning(Persona)
+    )
     if not persona:
         raise HTTPException(status_code=404, detail="Persona not found")
-    
-    # Update only the fields that were provided
-    if persona_update.label is not None:
-        persona.label = persona_update.label
-    if persona_update.north_star is not None:
-        persona.north_star = persona_update.north_star
-    if persona_update.is_calling is not None:
-        persona.is_calling = persona_update.is_calling
-    if persona_update.importance is not None:
-        persona.importance = persona_update.importance
-    
-    persona.updated_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(persona)
     return persona
 
 @app.delete("/personas/{persona_id}")
 def delete_persona_by_id(persona_id: UUID, db: Session = Depends(get_db)):
     """Delete a persona by its ID (preferred method)"""
-    persona = db.get(Persona, persona_id)
-    if not persona:
+    label = _delete_persona(db, Persona.id == persona_id)
+    if label is None:
         raise HTTPException(status_code=404, detail="Persona not found")
 
-    db.delete(persona)
     db.commit()
-    return {"message": f"Persona '{persona.label}' deleted successfully"}
+    return {"message": f"Persona '{label}' deleted successfully"}
 
 # DEPRECATED: Keep for backward compatibility but move to better endpoint
 @app.delete("/users/{user_id}/personas/{label}")
 def delete_persona_by_label(user_id: UUID, label: str, db: Session = Depends(get_db)):
     """Delete a persona by user ID and label (legacy endpoint)"""
-    persona = db.query(Persona).filter_by(user_id=user_id, label=label).first()
-    if not persona:
+    # Oldest matching persona, as a subquery both statements in _delete_persona reuse
+    target_id = (
+        select(Persona.id)
+        .where(Persona.user_id == user_id, Persona.label == label)
+        .order_by(Persona.created_at, Persona.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    if _delete_persona(db, Persona.id == target_id) is None:
         raise HTTPException(status_code=404, detail="Persona not found")
 
-    db.delete(persona)
     db.commit()
     return {"message": f"Persona '{label}' deleted for user {user_id}"}
 
+def _delete_persona(db: Session, condition) -> Optional[str]:
+    """
+    Delete the persona matching condition without loading it first.
+    
+    Like db.delete(), its goals are kept and unlinked (persona_id set to NULL).
+    Returns the deleted persona's label, or None if nothing matched.
+    """
+    db.execute(
+        update(Goal)
+        .where(Goal.persona_id.in_(select(Persona.id).where(condition)))
+        .values(persona_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(
+        delete(Persona).where(condition).returning(Persona.label).execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
 # ============================================
 # CONVERSATION ROUTES
 # ============================================
@@ -199,26 +257,85 @@ class MessageAdd(BaseModel):
     from_role: str  # 'user' or 'coach'
     text: str
 
+class MessageBulkAdd(BaseModel):
+    messages: List[MessageAdd]
+
 class ConversationComplete(BaseModel):
     key_insights: List[str]
     summary: Optional[str] = None
 
+class ConversationSummary(BaseModel):
+    """Conversation as listed in search/list results - everything but messages and agent state"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: UUID
+    user_id: Optional[UUID] = None
+    conversation_type: Optional[str] = None
+    topic: Optional[str] = None
+    status: Optional[str] = None
+    tags: Optional[List[str]] = None
+    key_insights: Optional[List[str]] = None
+    conversation_summary: Optional[str] = None
+    started_at: Optional[datetime] = None
+    last_activity_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+
+class ConversationList(BaseModel):
+    conversations: List[ConversationSummary]
+    total_count: int
+    filters_applied: dict
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last page
+
+class ConversationSearchResults(BaseModel):
+    conversations: List[ConversationSummary]
+    search_query: str
+    total_results: int
+    conversation_type_filter: Optional[str] = None
+
 class ConversationTagsUpdate(BaseModel):
     add_tags: Optional[List[str]] = None
     remove_tags: Optional[List[str]] = None
     tags: Optional[List[str]] = None  # For complete replacement
 
 
+# Messages per jsonb_build_array call when appending (Postgres allows at most 100 arguments)
+_MESSAGE_ARRAY_CHUNK = 50
+
+def _append_messages_values(messages: List[MessageAdd]) -> dict:
+    """UPDATE values that append messages to a conversation in SQL.
+    
+    The messages are built with jsonb_build_object, numbered on from the stored array
+    length and appended with jsonb ||, so existing messages never round-trip through Python.
+    """
+    now = datetime.utcnow()
+    timestamp = now.isoformat()
+    current_length = func.coalesce(func.jsonb_array_length(Conversation.messages), 0)
+    message_objects = [
+        func.jsonb_build_object(
+            'sequence', current_length + offset,
+            'timestamp', timestamp,
+            'from', message.from_role,
+            'text', message.text
+        )
+        for offset, message in enumerate(messages, start=1)
+    ]
+    
+    # Postgres caps function arguments at 100, so longer lists are built in chunks and joined
+    messages_expr = func.coalesce(Conversation.messages, cast([], JSONB))
+    for start in range(0, len(message_objects), _MESSAGE_ARRAY_CHUNK):
+        messages_expr = messages_expr.op('||')(
+            func.jsonb_build_array(*message_objects[start:start + _MESSAGE_ARRAY_CHUNK])
+        )
+    return {
+        'messages': messages_expr,
+        'last_activity_at': now
+    }
+
 @app.post("/conversations/")
 def create_conversation(conversation: ConversationCreate, db: Session = Depends(get_db)):
     """Create a new conversation (user-centric, no persona required)"""
-    # Validate user exists
-    user = db.get(User, conversation.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Create conversation without persona_id
-    db_conversation = Conversation(
+    # Create conversation without persona_id; a missing user is a 404 from the foreign key
+    return _commit_user_owned(db, insert(Conversation).values(
         user_id=conversation.user_id,
         conversation_type=conversation.conversation_type,
         topic=conversation.topic,
@@ -226,11 +343,7 @@ def create_conversation(conversation: ConversationCreate, db: Session = Depends(
         messages=[],
         key_insights=[],
         status='active'
-    )
-    db.add(db_conversation)
-    db.commit()
-    db.refresh(db_conversation)
-    return db_conversation
+    ).returning(Conversation))
 
 
 
@@ -241,25 +354,39 @@ def add_message_to_conversation(
     db: Session = Depends(get_db)
 ):
     """Add a message to an ongoing conversation"""
-    conversation = db.get(Conversation, conversation_id)
+    conversation = _commit_returning(
+        db,
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(**_append_messages_values([message]))
+        .returning(Conversation)
+    )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    current_messages = conversation.messages or []
-    
-    new_message = {
-        "sequence": len(current_messages) + 1,
-        "timestamp": datetime.utcnow().isoformat(),
-        "from": message.from_role,
-        "text": message.text
-    }
-    
-    updated_messages = current_messages + [new_message]
-    conversation.messages = updated_messages
-    conversation.last_activity_at = datetime.utcnow()
+    return {"message": "Message added", "conversation": conversation}
+
+
+
+@app.post("/conversations/{conversation_id}/messages/bulk")
+def add_messages_to_conversation(
+    conversation_id: str,
+    payload: MessageBulkAdd,
+    db: Session = Depends(get_db)
+):
+    """Add several messages to a conversation in one statement and commit"""
+    updated_id = db.scalars(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(**_append_messages_values(payload.messages))
+        .returning(Conversation.id)
+    ).one_or_none()
+    if not updated_id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
     
     db.commit()
-    return {"message": "Message added", "conversation": conversation}
+    # Only the count - echoing the conversation back would serialize every message
+    return {"inserted": len(payload.messages)}
 
 
 
@@ -290,6 +417,19 @@ def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Conversation not found")
     return conversation
 
+def _merged_tags(add_tags: List[str], remove_tags: List[str]):
+    """SQL expression for a conversation's tags with add_tags appended and remove_tags dropped"""
+    tags_type = Conversation.tags.type
+    combined = func.coalesce(Conversation.tags, cast([], tags_type)).op('||')(cast(add_tags, tags_type))
+    tag_list = func.unnest(combined).table_valued('tag', with_ordinality='ordinal').render_derived(name='tag_list')
+    return func.array(
+        select(tag_list.c.tag)
+        .where(tag_list.c.tag != all_(cast(remove_tags, tags_type)))
+        .group_by(tag_list.c.tag)
+        .order_by(func.min(tag_list.c.ordinal))
+        .scalar_subquery()
+    )
+
 @app.patch("/conversations/{conversation_id}/tags")
 def update_conversation_tags(
     conversation_id: str,
@@ -297,113 +437,234 @@ def update_conversation_tags(
     db: Session = Depends(get_db)
 ):
     """Add, remove, or replace tags on a conversation"""
-    conversation = db.get(Conversation, conversation_id)
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    current_tags = conversation.tags or []
-    
     if tag_update.tags is not None:
         # Complete replacement
-        conversation.tags = tag_update.tags
+        tags = tag_update.tags
     else:
-        # Incremental updates
-        new_tags = set(current_tags)
-        
-        if tag_update.add_tags:
-            new_tags.update(tag_update.add_tags)
-        
-        if tag_update.remove_tags:
-            new_tags.difference_update(tag_update.remove_tags)
-        
-        conversation.tags = list(new_tags)
-    
-    conversation.last_activity_at = datetime.utcnow()
-    db.commit()
-    db.refresh(conversation)
+        # Incremental updates, merged in SQL: stored tags then added ones, minus removed
+        # ones, each kept once in first-seen order
+        tags = _merged_tags(tag_update.add_tags or [], tag_update.remove_tags or [])
+    
+    conversation = _commit_returning(
+        db,
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(tags=tags, last_activity_at=datetime.utcnow())
+        .returning(Conversation)
+    )
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
     return conversation
 
-@app.get("/users/{user_id}/conversations")
-def get_user_conversations(
-    user_id: str,
-    conversation_type: Optional[str] = None,
-    tag: Optional[str] = None,
+def _json_response(model, data: dict) -> Response:
+    """Validate data (ORM rows included) into the response model and serialize it to JSON
+    in one pass in pydantic-core; the route's response_model stays for the API schema"""
+    return Response(content=model.model_validate(data).model_dump_json(), media_type="application/json")
+
+# Columns loaded for conversation lists; messages can be long and are left in the database
+_SUMMARY_COLUMNS = load_only(*(
+    getattr(Conversation, field) for field in ConversationSummary.model_fields
+))
+
+# Conversation list statements, built once at import. Per-request filters are added with
+# .where() and all values are bound at execution, so each variant compiles once and is
+# served from the engine's compiled cache afterwards
+_USER_CONVERSATIONS = (
+    select(Conversation)
+    .options(_SUMMARY_COLUMNS)
+    .where(Conversation.user_id == bindparam('user_id'))
+    .order_by(Conversation.last_activity_at.desc(), Conversation.id.desc())
+)
+_BY_CONVERSATION_TYPE = Conversation.conversation_type == bindparam('conversation_type')
+# tags @> ARRAY[tag] with 'tags' bound to [tag]; containment can use the GIN index on tags
+# where = ANY(tags) can't. Cast so the bound text[] compares as the column's varchar[]
+_HAS_TAG = Conversation.tags.contains(cast(bindparam('tags'), Conversation.tags.type))
+# Keyset pagination: conversations after the cursor in (last_activity_at, id) DESC order
+_BEFORE_CURSOR = tuple_(Conversation.last_activity_at, Conversation.id) < tuple_(
+    bindparam('before_activity', type_=Conversation.last_activity_at.type),
+    bindparam('before_id', type_=Conversation.id.type)
+)
+
+# Full-text match of the search text bound as 'q' against topic, tags and summary
+# (Conversation.search_tsv, GIN indexed), best matches first and then most recent
+_SEARCH_QUERY = func.plainto_tsquery('english', bindparam('q'))
+_CONVERSATION_SEARCH = (
+    select(Conversation)
+    .options(_SUMMARY_COLUMNS)
+    .where(
+        Conversation.user_id == bindparam('user_id'),
+        Conversation.search_tsv.op('@@')(_SEARCH_QUERY)
+    )
+    .order_by(
+        func.ts_rank(Conversation.search_tsv, _SEARCH_QUERY).desc(),
+        Conversation.last_activity_at.desc()
+    )
+)
+
+def _conversation_page(
+    db: Session,
+    stmt,
+    params: dict,
     limit: Optional[int] = None,
-    offset: Optional[int] = 0,
-    db: Session = Depends(get_db)
+    offset: Optional[int] = None,
+    after=None
 ):
-    """
-    Get conversations for a user with flexible filtering
+    """Run a conversation list statement for one page.
     
     Args:
-        user_id: UUID of the user
-        conversation_type: Filter by type ('discovery', 'refinement', 'decision_making', etc.)
-        tag: Filter by tag (e.g., 'Professional', 'Creative', 'goal-setting')
-        limit: Maximum number of conversations to return
-        offset: Number of conversations to skip (for pagination)
         db: Database session
+        stmt: Filtered and ordered select(Conversation), without limit/offset
+        params: Bound values for the statement
+        limit: Maximum number of conversations to return
+        offset: Number of conversations to skip
+        after: Keyset predicate (e.g. _BEFORE_CURSOR) that narrows the page but not the total
         
     Returns:
-        List of conversations matching the filters
+        (conversations on the page, total conversations matching the filters, whether more
+        follow the page); the counts ride along on each row - count(*) OVER () for the rows
+        from the page on and, with a keyset predicate, a count over the filters alone - so
+        they cost no second query
     """
+    page = stmt.add_columns(func.count().over())
+    if after is not None:
+        # Uncorrelated, so it counts every conversation the filters match, cursor or not
+        page = page.where(after).add_columns(
+            select(func.count()).select_from(Conversation).where(stmt.whereclause)
+            .correlate(None).scalar_subquery()
+        )
+    if offset:
+        page = page.offset(offset)
+    if limit:
+        page = page.limit(limit)
+    
+    rows = db.execute(page, params).all()
+    if rows:
+        conversations = [row[0] for row in rows]
+        more = (offset or 0) + len(conversations) < rows[0][1]
+        return conversations, rows[0][-1], more
+    if offset or after is not None:
+        # Paged past the end - no row to carry the total, so count directly
+        return [], db.scalar(select(func.count()).select_from(Conversation).where(stmt.whereclause), params), False
+    return [], 0, False
+
+def _encode_cursor(conversation: Conversation) -> str:
+    """Opaque keyset cursor for paging on from this conversation"""
+    raw = f"{conversation.last_activity_at.isoformat()}|{conversation.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> dict:
+    """Bound values for _BEFORE_CURSOR from a cursor made by _encode_cursor"""
+    try:
+        activity, conversation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return {'before_activity': datetime.fromisoformat(activity), 'before_id': UUID(conversation_id)}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _list_user_conversations(
+    db: Session,
+    user_id: str,
+    conversation_type: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = 0,
+    cursor: Optional[str] = None
+) -> Response:
+    """Build the ConversationList response shared by the conversation list routes (see get_user_conversations)"""
     # Validate user exists
-    user = db.get(User, user_id)
-    if not user:
+    if not _user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Build the base query
-    query = db.query(Conversation).filter_by(user_id=user_id)
+    # Build the query from the prebuilt statement
+    stmt = _USER_CONVERSATIONS
+    params = {'user_id': user_id}
     
     # Apply conversation_type filter
     if conversation_type:
-        query = query.filter(Conversation.conversation_type == conversation_type)
+        stmt = stmt.where(_BY_CONVERSATION_TYPE)
+        params['conversation_type'] = conversation_type
     
     # Apply tag filter using PostgreSQL array operations
     if tag:
         # Use PostgreSQL's array contains operator
         # This checks if the tag exists anywhere in the tags array
-        query = query.filter(Conversation.tags.any(tag))
-    
-    # Order by most recent first
-    query = query.order_by(Conversation.last_activity_at.desc())
-    
-    # Apply pagination
-    if offset:
-        query = query.offset(offset)
-    if limit:
-        query = query.limit(limit)
-    
-    # Execute query and return results
-    conversations = query.all()
+        stmt = stmt.where(_HAS_TAG)
+        params['tags'] = [tag]
+    
+    # Continue after the previous page
+    after = None
+    if cursor:
+        after = _BEFORE_CURSOR
+        params.update(_decode_cursor(cursor))
+    
+    # Execute query for the requested page (most recent first comes from the prebuilt
+    # statement); total_count covers every matching conversation, not just this page or
+    # the ones after the cursor
+    conversations, total_count, more = _conversation_page(
+        db, stmt, params, limit=limit, offset=offset, after=after
+    )
     
-    return {
+    return _json_response(ConversationList, {
         "conversations": conversations,
-        "total_count": len(conversations),
+        "total_count": total_count,
         "filters_applied": {
             "user_id": user_id,
             "conversation_type": conversation_type,
             "tag": tag,
             "limit": limit,
-            "offset": offset
-        }
-    }
+            "offset": offset,
+            "cursor": cursor
+        },
+        "next_cursor": _encode_cursor(conversations[-1]) if more else None
+    })
+
+@app.get("/users/{user_id}/conversations", response_model=ConversationList)
+def get_user_conversations(
+    user_id: str,
+    conversation_type: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = 0,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get conversations for a user with flexible filtering
+    
+    Args:
+        user_id: UUID of the user
+        conversation_type: Filter by type ('discovery', 'refinement', 'decision_making', etc.)
+        tag: Filter by tag (e.g., 'Professional', 'Creative', 'goal-setting')
+        limit: Maximum number of conversations to return
+        offset: Number of conversations to skip (prefer cursor beyond the first pages)
+        cursor: next_cursor from the previous page; continues after it via an index
+            range scan, unlike offset which reads and discards the skipped rows
+        db: Database session
+        
+    Returns:
+        List of conversations matching the filters, with total_count counting all of them
+        (the same on every page, cursor or not) and next_cursor set while more follow
+    """
+    return _list_user_conversations(
+        db,
+        user_id,
+        conversation_type=conversation_type,
+        tag=tag,
+        limit=limit,
+        offset=offset,
+        cursor=cursor
+    )
 
 # Additional helper endpoints for common use cases
-@app.get("/users/{user_id}/conversations/discovery")
+@app.get("/users/{user_id}/conversations/discovery", response_model=ConversationList)
 def get_discovery_conversations(
     user_id: str, 
     limit: Optional[int] = 10,
     db: Session = Depends(get_db)
 ):
     """Shorthand endpoint for discovery conversations"""
-    return get_user_conversations(
-        user_id=user_id,
-        conversation_type="discovery",
-        limit=limit,
-        db=db
-    )
+    return _list_user_conversations(db, user_id, conversation_type="discovery", limit=limit)
 
-@app.get("/users/{user_id}/conversations/by-persona/{persona_name}")
+@app.get("/users/{user_id}/conversations/by-persona/{persona_name}", response_model=ConversationList)
 def get_conversations_by_persona_name(
     user_id: str,
     persona_name: str,
@@ -411,14 +672,9 @@ def get_conversations_by_persona_name(
     db: Session = Depends(get_db)
 ):
     """Get conversations that discuss a specific persona by name"""
-    return get_user_conversations(
-        user_id=user_id,
-        tag=persona_name,
-        limit=limit,
-        db=db
-    )
+    return _list_user_conversations(db, user_id, tag=persona_name, limit=limit)
 
-@app.get("/users/{user_id}/conversations/search")
+@app.get("/users/{user_id}/conversations/search", response_model=ConversationSearchResults)
 def search_conversations(
     user_id: str,
     q: str,  # search query
@@ -435,47 +691,27 @@ def search_conversations(
         conversation_type: Optional filter by conversation type
         limit: Maximum results to return
     """
-    from sqlalchemy import func
-    
     # Validate user exists
-    user = db.get(User, user_id)
-    if not user:
+    if not _user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Build search query
-    query = db.query(Conversation).filter_by(user_id=user_id)
+    # Search topic, tags and summary by relevance (messages are JSONB and not searched for now)
+    stmt = _CONVERSATION_SEARCH
+    params = {'user_id': user_id, 'q': q}
     
     # Apply conversation_type filter if provided
     if conversation_type:
-        query = query.filter(Conversation.conversation_type == conversation_type)
-    
-    # Search in multiple fields using PostgreSQL text search
-    search_filter = (
-        # Search in topic
-        Conversation.topic.ilike(f"%{q}%") |
-        # Search in tags array (convert to text and search)
-        func.array_to_string(Conversation.tags, ' ').ilike(f"%{q}%") |
-        # Search in conversation summary
-        Conversation.conversation_summary.ilike(f"%{q}%")
-        # Note: Removed messages search for now as it's more complex with JSONB
-    )
-    
-    query = query.filter(search_filter)
-    
-    # Order by relevance (most recent first for now)
-    query = query.order_by(Conversation.last_activity_at.desc())
-    
-    if limit:
-        query = query.limit(limit)
+        stmt = stmt.where(_BY_CONVERSATION_TYPE)
+        params['conversation_type'] = conversation_type
     
-    conversations = query.all()
+    conversations, total_results, _ = _conversation_page(db, stmt, params, limit=limit)
     
-    return {
+    return _json_response(ConversationSearchResults, {
         "conversations": conversations,
         "search_query": q,
-        "total_results": len(conversations),
+        "total_results": total_results,
         "conversation_type_filter": conversation_type
-    }
+    })
 
 
 
@@ -484,31 +720,65 @@ def search_conversations(
 # ============================================
 
 @app.post("/api/conversation/process", response_model=ConversationResponse)
-async def process_conversation(request: ConversationRequest, db: Session = Depends(get_db)):
+async def process_conversation(
+    request: ConversationRequest,
+    db: Session = Depends(get_db),
+    conversation_manager: ConversationManager = Depends(get_conversation_manager)
+):
     """
     Process a user message through the intelligent agent system
     Uses ConversationManager for intent analysis and agent selection
     """
     try:
-        # Create ConversationManager instance
-        conversation_manager = ConversationManager()
-        
         # Process message through the conversation manager
         response = await conversation_manager.process_message(request, db)
         
-        return response
+        # Serialize straight to JSON in pydantic-core; response_model stays for the API schema
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing conversation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing conversation: {str(e)}") from e
+
+
+@app.post("/api/conversation/process/stream", response_model=ConversationResponse)
+async def process_conversation_stream(
+    request: ConversationRequest,
+    conversation_manager: ConversationManager = Depends(get_conversation_manager)
+):
+    """
+    Process a user message like /api/conversation/process, streaming the reply as
+    server-sent events: a data event ({"text": ...}) per chunk of the reply, then a
+    "response" event with the saved ConversationResponse (or an "error" event)
+    """
+    async def events():
+        # The stream outlives the request-scoped get_db session, so it owns its own
+        db = SessionLocal()
+        try:
+            async for item in conversation_manager.process_message_stream(request, db):
+                if isinstance(item, ConversationResponse):
+                    yield f"event: response\ndata: {item.model_dump_json()}\n\n"
+                else:
+                    yield f"data: {json.dumps({'text': item})}\n\n"
+        except Exception as e:
+            # The status line has gone out with the first event, so errors are reported in-stream
+            db.rollback()
+            detail = json.dumps({'detail': f"Error processing conversation: {str(e)}"})
+            yield f"event: error\ndata: {detail}\n\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @app.post("/api/conversation/analyze-intent")
-async def analyze_intent(request: dict):
+async def analyze_intent(
+    request: dict,
+    conversation_manager: ConversationManager = Depends(get_conversation_manager)
+):
     """
     Analyze intent of a message (for testing/debugging)
     """
     try:
-        conversation_manager = ConversationManager()
         message = request.get('message', '')
         context = request.get('context', {})
         
@@ -534,21 +804,22 @@ async def analyze_intent(request: dict):
 @app.post("/goals/")
 def create_goal(goal: GoalCreate, db: Session = Depends(get_db)):
     """Create a new goal, optionally for a persona"""
-    # Validate user exists
-    user = db.get(User, goal.user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Validate persona exists if persona_id is provided
-    if goal.persona_id is not None:
-        persona = db.get(Persona, goal.persona_id)
-        if not persona:
+    # Validate the persona if persona_id is provided. One query for the usual case: the
+    # persona exists and belongs to the user (which implies the user exists); only a miss
+    # pays for working out which check failed
+    if goal.persona_id is not None and db.scalar(
+        select(Persona.id).where(Persona.id == goal.persona_id, Persona.user_id == goal.user_id)
+    ) is None:
+        # Validate user exists
+        if not _user_exists(db, goal.user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        if db.scalar(select(Persona.id).where(Persona.id == goal.persona_id)) is None:
             raise HTTPException(status_code=404, detail="Persona not found")
-        # Ensure persona belongs to the same user
-        if persona.user_id != goal.user_id:
-            raise HTTPException(status_code=400, detail="Persona does not belong to the specified user")
+        # It exists, so it belongs to another user
+        raise HTTPException(status_code=400, detail="Persona does not belong to the specified user")
     
-    db_goal = Goal(
+    # Without a persona, a missing user is a 404 from the foreign key
+    return _commit_user_owned(db, insert(Goal).values(
         user_id=goal.user_id,
         persona_id=goal.persona_id,
         name=goal.name,
@@ -556,11 +827,7 @@ def create_goal(goal: GoalCreate, db: Session = Depends(get_db)):
         review_date=goal.review_date,
         planned_hours=goal.planned_hours or 0,
         actual_hours=goal.actual_hours or 0
-    )
-    db.add(db_goal)
-    db.commit()
-    db.refresh(db_goal)
-    return db_goal
+    ).returning(Goal))
 
 @app.get("/personas/{persona_id}/goals")
 def list_persona_goals(persona_id: UUID, db: Session = Depends(get_db)):
@@ -581,33 +848,19 @@ def get_goal(goal_id: UUID, db: Session = Depends(get_db)):
 @app.put("/goals/{goal_id}")
 def update_goal(goal_id: UUID, goal_update: GoalUpdate, db: Session = Depends(get_db)):
     """Update an existing goal"""
-    goal = db.get(Goal, goal_id)
+    # Update only the fields that were provided (non-null)
+    changes = goal_update.model_dump(exclude_none=True)
+    # Validate percentage is between 0-100
+    if 'success_percentage' in changes and not (0 <= changes['success_percentage'] <= 100):
+        raise HTTPException(status_code=400, detail="Success percentage must be between 0 and 100")
+    
+    if changes:
+        # One UPDATE ... RETURNING instead of SELECT, UPDATE and a refresh SELECT
+        goal = _commit_returning(db, update(Goal).where(Goal.id == goal_id).values(**changes).returning(Goal))
+    else:
+        goal = db.get(Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
-    
-    # Update only the fields that were provided
-    if goal_update.name is not None:
-        goal.name = goal_update.name
-    if goal_update.acceptance_criteria is not None:
-        goal.acceptance_criteria = goal_update.acceptance_criteria
-    if goal_update.review_date is not None:
-        goal.review_date = goal_update.review_date
-    if goal_update.status is not None:
-        goal.status = goal_update.status
-    if goal_update.success_percentage is not None:
-        # Validate percentage is between 0-100
-        if not (0 <= goal_update.success_percentage <= 100):
-            raise HTTPException(status_code=400, detail="Success percentage must be between 0 and 100")
-        goal.success_percentage = goal_update.success_percentage
-    if goal_update.review_notes is not None:
-        goal.review_notes = goal_update.review_notes
-    if goal_update.planned_hours is not None:
-        goal.planned_hours = goal_update.planned_hours
-    if goal_update.actual_hours is not None:
-        goal.actual_hours = goal_update.actual_hours
-    
-    db.commit()
-    db.refresh(goal)
     return goal
 
 @app.delete("/goals/{goal_id}")
@@ -624,31 +877,30 @@ def delete_goal(goal_id: UUID, db: Session = Depends(get_db)):
 @app.get("/users/{user_id}/goals")
 def list_user_goals(user_id: UUID, db: Session = Depends(get_db)):
     """Get all goals for a user, both with and without personas"""
-    user = db.get(User, user_id)
-    if not user:
+    if not _user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Now we can directly access all goals for this user via the relationship
-    return user.goals
+    # Query the goals directly rather than loading the user and then user.goals
+    return db.query(Goal).filter_by(user_id=user_id).all()
 
 @app.get("/users/{user_id}/goals/due")
 def get_goals_due_for_review(user_id: UUID, db: Session = Depends(get_db)):
     """Get all goals that are due for review (review_date <= today)"""
-    from datetime import date
+    from datetime import date, time, timedelta
     
-    user = db.get(User, user_id)
-    if not user:
+    if not _user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
     
-    today = date.today()
-    due_goals = []
-    
-    # Check all user goals (both with and without personas)
-    for goal in user.goals:
-        if goal.review_date.date() <= today and goal.status == 'active':
-            due_goals.append(goal)
+    # Due means any time up to the end of today; comparing against tomorrow's midnight
+    # keeps the predicate a plain range on review_date so the composite index applies
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), time.min)
     
-    return due_goals
+    # All user goals (both with and without personas)
+    return db.query(Goal).filter(
+        Goal.user_id == user_id,
+        Goal.status == 'active',
+        Goal.review_date < tomorrow
+    ).all()
 
 # ============================================
 # DASHBOARD ROUTES  
@@ -674,7 +926,13 @@ class DashboardData(BaseModel):
 @app.get("/users/{user_id}/dashboard", response_model=DashboardData)
 def get_user_dashboard(user_id: UUID, db: Session = Depends(get_db)):
     """Get dashboard data for force-directed visualization"""
-    user = db.get(User, user_id)
+    # Load the personas and all their goals up front (one IN query each) instead of
+    # a lazy load per persona in the loop below
+    user = db.execute(
+        select(User)
+        .where(User.id == user_id)
+        .options(selectinload(User.personas).selectinload(Persona.goals))
+    ).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -732,5 +990,4 @@ def get_user_dashboard(user_id: UUID, db: Session = Depends(get_db)):
     )
 
 # Include auth router
-from email_magic_link_auth import router as auth_router
 app.include_router(auth_router)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""
+Queue weekly progress reviews through the OpenAI Batch API and store the results
+
+Usage:
+    python progress_review_batch.py submit              # prints the batch ID
+    python progress_review_batch.py collect <batch_id>  # stores finished reviews
+
+collect exits 0 once the reviews are stored, 1 while the batch is still in progress
+(retry later) and 3 if the batch failed, expired or was cancelled (submit a new one)
+"""
+
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from db import SessionLocal
+from models import Conversation, Goal, Persona
+from agents.batch import BatchFailedError, get_batch_results
+from agents.management import ManagementAgent
+from datetime import datetime
+from uuid import UUID, uuid4
+
+# Message the management agent answers for each user, as if sent from the chat
+PROGRESS_REVIEW_MESSAGE = "Review my progress across my personas and goals"
+
+def _review_requests(db: Session) -> List[Dict[str, Any]]:
+    """One process_message_batched item per user with personas, keyed by user ID"""
+    personas = defaultdict(list)
+    for user_id, label, north_star in db.execute(
+        select(Persona.user_id, Persona.label, Persona.north_star).order_by(Persona.created_at)
+    ):
+        personas[user_id].append({'name': label, 'north_star': north_star})
+
+    goals = defaultdict(list)
+    for user_id, name in db.execute(select(Goal.user_id, Goal.name).where(Goal.status == 'active')):
+        goals[user_id].append({'name': name})
+
+    return [
+        {
+            'custom_id': str(user_id),
+            'message': PROGRESS_REVIEW_MESSAGE,
+            'context': {
+                'user_id': str(user_id),
+                'user_personas': user_personas,
+                'user_goals': goals[user_id],
+                'conversation_history': []
+            }
+        }
+        for user_id, user_personas in personas.items()
+    ]
+
+async def submit_progress_reviews(db: Session) -> Optional[str]:
+    """
+    Queue a progress review for every user with personas
+
+    Args:
+        db: Database session
+
+    Returns:
+        Batch ID to pass to collect_progress_reviews, or None if there was nothing to review
+    """
+    requests = _review_requests(db)
+    if not requests:
+        return None
+    return await ManagementAgent().process_message_batched(requests)
+
+async def collect_progress_reviews(db: Session, batch_id: str) -> Optional[int]:
+    """
+    Store the reviews of a finished batch as completed management conversations
+
+    Args:
+        db: Database session
+        batch_id: ID returned by submit_progress_reviews
+
+    Returns:
+        Number of reviews stored, or None if the batch is still in progress
+
+    Raises:
+        BatchFailedError: If the batch failed, expired or was cancelled
+    """
+    results = await get_batch_results(batch_id)
+    if results is None:
+        return None
+
+    agent = ManagementAgent()
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': uuid4(),
+            'user_id': UUID(user_id),
+            'conversation_type': 'progress_review',
+            'topic': 'Progress review',
+            'status': 'completed',
+            'agent_type': agent.agent_type,
+            'messages': [{
+                'id': f"msg-{uuid4().hex}-agent",
+                'from': 'agent',
+                'text': agent.clean_response_for_user(text),
+                'timestamp': now.isoformat(),
+                'agent_type': agent.agent_type
+            }],
+            'context_state': {},
+            'started_at': now,
+            'last_activity_at': now,
+            'ended_at': now
+        }
+        for user_id, text in results.items()
+        if text  # Failed requests come back as None
+    ]
+    if rows:
+        # One multi-row INSERT for the whole batch
+        db.execute(insert(Conversation), rows)
+        db.commit()
+    return len(rows)
+
+def main(argv: List[str]) -> int:
+    db = SessionLocal()
+    try:
+        if argv[1:2] == ['submit']:
+            batch_id = asyncio.run(submit_progress_reviews(db))
+            print(batch_id or "No users with personas to review")
+            return 0
+        if argv[1:2] == ['collect'] and len(argv) == 3:
+            try:
+                stored = asyncio.run(collect_progress_reviews(db, argv[2]))
+            except BatchFailedError as e:
+                # Retrying won't help - submit a new batch instead
+                print(f"❌ {e} - submit a new batch")
+                return 3
+            if stored is None:
+                print("Batch not finished yet - try again later")
+                return 1
+            print(f"✅ Stored {stored} progress review(s)")
+            return 0
+        print(__doc__)
+        return 2
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -51,10 +51,23 @@ def setup_environment():
     
     print("✅ Environment variables set")
 
+def xdist_available():
+    """Check if pytest-xdist is installed for parallel test runs"""
+    try:
+        import xdist
+        return True
+    except ImportError:
+        return False
+
 def run_tests(test_type="all", coverage=True, verbose=True):
     """Run the specified tests"""
     base_cmd = "pytest"
     
+    # Spread whole-suite runs over one worker per core; each test file stays on one
+    # worker, and each worker gets its own test database (see tests/conftest.py)
+    if test_type in ("all", "fast") and xdist_available():
+        base_cmd += f" -n {os.cpu_count() or 1} --dist=loadfile"
+    
     # Add verbosity
     if verbose:
         base_cmd += " -v"
@@ -6,7 +6,7 @@ from unittest.mock import Mock, AsyncMock, patch
 from uuid import uuid4
 from datetime import datetime
 
-from conversation_manager import ConversationManager
+from conversation_manager import ConversationManager, get_conversation_manager
 from conversation_models import ConversationRequest, ConversationResponse
 from agents.educational import EducationalAgent
 from agents.discovery import DiscoveryAgent
@@ -73,6 +73,73 @@ class TestConversationManager:
             assert intent == expected_intent, f"Failed for '{message}': got {intent}, expected {expected_intent}"
             assert confidence > 0.5, f"Low confidence {confidence} for '{message}'"
     
+    def test_bare_yes_no_replies(self):
+        """Test bare yes/no replies resolve without the pattern sweep, honouring pending transitions"""
+        assert self.manager.analyze_intent(" Yes ", {}) == ("affirmative_response", 0.70)
+        assert self.manager.analyze_intent("not yet", {}) == ("negative_response", 0.70)
+        
+        context = {'awaiting_transition_confirmation': True, 'pending_transition': 'goal_setting'}
+        assert self.manager.analyze_intent("ok", context) == ("goal_setting", 0.95)
+        assert self.manager.analyze_intent("nope", context) == ("concept_clarification", 0.90)
+    
+    def test_pattern_sweep_cached_per_message(self):
+        """Test repeated messages reuse the cached sweep while context-dependent fallbacks still apply"""
+        with patch.object(self.manager, '_calculate_confidence', wraps=self.manager._calculate_confidence) as mock_confidence:
+            assert self.manager.analyze_intent("Show me all my personas", {})[0] == "overview_request"
+            assert self.manager.analyze_intent("show me all my personas ", {})[0] == "overview_request"
+        assert mock_confidence.call_count == 1
+        
+        history = [{'from': 'agent', 'text': 'Want to discover your own personas?'}]
+        assert self.manager.analyze_intent("hmm", {}) == ("concept_explanation", 0.50)
+        assert self.manager.analyze_intent("hmm", {'conversation_history': history}) == ("concept_explanation", 0.60)
+    
+    def test_infer_intent_from_last_agent_text(self):
+        """Test the last agent message comes from the built context or, failing that, the history"""
+        history = [{'from': 'agent', 'text': 'Want to discover your own personas?'}, {'from': 'user', 'text': 'hmm'}]
+        
+        assert self.manager._infer_intent_from_context("yes", {'last_agent_text': history[0]['text']}) == "persona_creation"
+        assert self.manager._infer_intent_from_context("no", {'conversation_history': history}) == "concept_clarification"
+        assert self.manager._infer_intent_from_context("yes", {'last_agent_text': None, 'conversation_history': history}) == "concept_explanation"
+    
+    def test_session_context_keeps_recent_history(self):
+        """Test session history is capped to the most recent messages but fully counted"""
+        from conversation_manager import SESSION_HISTORY_LIMIT
+        older = Mock(messages=[{'id': f'old-{i}'} for i in range(SESSION_HISTORY_LIMIT)],
+                     context_state={'history_summary': "Earlier talk"}, conversation_summary="Completed talk")
+        current = Mock(id=uuid4(), messages=[{'id': 'new-0'}, {'id': 'new-1'}], context_state={}, conversation_summary=None, agent_type='goal')
+        request = ConversationRequest(user_id=str(uuid4()), session_id=str(uuid4()), message="hi")
+        
+        context = self.manager._build_session_context(current, request, Mock(), [older, current])
+        
+        assert len(context['session_history']) == SESSION_HISTORY_LIMIT
+        assert context['session_history'][-2:] == current.messages
+        assert context['session_message_count'] == SESSION_HISTORY_LIMIT + 2
+        assert context['history_summary'] == "Earlier talk"
+    
+    def test_required_literal_prefilter(self):
+        """Test prefilter words are only taken from mandatory parts of a pattern"""
+        from conversation_manager import _required_literal
+        
+        assert _required_literal(r'help\s+me\s+understand\s+(persona|northstar)') == "understand"
+        assert _required_literal(r'set\s+goals?\s+for') == "goal"
+        assert _required_literal(r'(want\s+to\s+)?(create|find)\s+(persona|personas)') is None
+        assert _required_literal(r'^no$') is None
+        assert self.manager.intent_literals['persona_creation'] is None
+    
+    def test_anchored_patterns_partitioned(self):
+        """Test ^word$ / ^word patterns become literals and the rest stay regex"""
+        from conversation_manager import _partition_patterns
+        
+        exact, prefixes, regexes = _partition_patterns([r'^yes$', r'^let me', r'yes,?\s+'])
+        assert exact == frozenset({'yes'})
+        assert prefixes == ('let me',)
+        assert regexes == [r'yes,?\s+']
+        
+        assert 'nope' in self.manager.intent_exact['negative_response']
+        assert self.manager._matches_patterns("nope", 'negative_response')
+        assert self.manager._matches_patterns("no, thanks", 'negative_response')
+        assert not self.manager._matches_patterns("nopes", 'negative_response')
+    
     def test_agent_selection(self):
         """Test agent selection based on intent"""
         test_cases = [
@@ -121,6 +188,171 @@ class TestConversationManager:
             # For now, just verify the logic exists
             assert hasattr(self.manager, 'process_message')
 
+    
+    @pytest.mark.asyncio
+    async def test_forced_agent_without_session_history_skips_session_query(self):
+        """Test a forced agent that only reads the current conversation doesn't load the session"""
+        conversation = Mock(id=uuid4(), agent_type="goal", messages=[{'id': 'm1', 'from': 'user', 'text': 'hi'}], context_state={})
+        db = Mock()
+        db.get.return_value = conversation
+        request = ConversationRequest(
+            user_id=str(uuid4()),
+            session_id=str(uuid4()),
+            conversation_id=str(conversation.id),
+            message="hello",
+            target_persona_id=str(uuid4()),
+            agent_context={"force_agent_type": "goal"}
+        )
+        response = ConversationResponse(
+            conversation_id="test",
+            agent_type="goal",
+            user_response="Goal response",
+            database_changes={},
+            agent_transition={'occurred': False},
+            context_updates={}
+        )
+        
+        goal_agent = self.manager._get_agent('goal')
+        with patch.object(goal_agent, 'process_message', AsyncMock(return_value=response)) as mock_process, \
+             patch.object(self.manager, '_save_conversation', AsyncMock()):
+            await self.manager.process_message(request, db)
+        
+        db.query.assert_not_called()
+        context = mock_process.call_args[0][1]
+        assert context['session_history'] == conversation.messages
+        assert context['selected_agent'] == "goal"
+    
+    @pytest.mark.asyncio
+    async def test_history_summary_refreshed_in_background(self):
+        """Test a due history summary runs after the reply in its own session and a failure is only logged"""
+        from agents.base import HISTORY_SUMMARY_INTERVAL
+        messages = [{'id': f'msg-{i}', 'from': 'user', 'text': f'turn {i}'} for i in range(HISTORY_SUMMARY_INTERVAL - 2)]
+        conversation = Mock(id=uuid4(), agent_type="goal", messages=messages, context_state={})
+        db = Mock()
+        db.get.return_value = conversation
+        summary_db = Mock()
+        summary_db.get.return_value = conversation
+        self.manager.session_factory = Mock(return_value=summary_db)
+        request = ConversationRequest(
+            user_id=str(uuid4()),
+            conversation_id=str(conversation.id),
+            message="hello",
+            target_persona_id=str(uuid4()),
+            agent_context={"force_agent_type": "goal"}
+        )
+        response = ConversationResponse(
+            conversation_id="test",
+            agent_type="goal",
+            user_response="Goal response",
+            database_changes={},
+            agent_transition={'occurred': False},
+            context_updates={}
+        )
+        
+        goal_agent = self.manager._get_agent('goal')
+        with patch.object(goal_agent, 'process_message', AsyncMock(return_value=response)), \
+             patch.object(goal_agent, 'summarize_history', AsyncMock(side_effect=RuntimeError("API down"))) as mock_summarize, \
+             patch.object(self.manager, '_save_conversation', AsyncMock()) as mock_save:
+            result = await self.manager.process_message(request, db)
+            
+            # The reply is back and saved before the summary has been attempted
+            assert result is response
+            mock_save.assert_awaited_once()
+            mock_summarize.assert_not_called()
+            
+            await asyncio.gather(*self.manager._background_tasks)
+        
+        assert mock_summarize.call_args[0][0]['session_history'] == messages
+        db.rollback.assert_not_called()
+        summary_db.rollback.assert_called_once()
+        summary_db.close.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_history_summary_records_refresh_count(self):
+        """Test a stored summary records the message count it was refreshed at"""
+        messages = [{'id': f'msg-{i}', 'from': 'user', 'text': f'turn {i}'} for i in range(30)]
+        conversation = Mock(id=uuid4(), messages=messages, context_state={})
+        summary_db = Mock()
+        summary_db.get.return_value = conversation
+        self.manager.session_factory = Mock(return_value=summary_db)
+        request = ConversationRequest(user_id=str(uuid4()), message="hello")
+        
+        agent = self.manager._get_agent('goal')
+        with patch.object(agent, 'summarize_history', AsyncMock(return_value="User set a writing goal.")):
+            await self.manager._refresh_history_summary(agent, request, str(conversation.id), None, 0)
+        
+        assert conversation.context_state.compile().params['param_2'] == {
+            'history_summary': "User set a writing goal.",
+            'history_summary_at': 30
+        }
+        summary_db.commit.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_process_message_stream_saves_final_response(self):
+        """Test the manager streams the agent's text and saves the turn once the final response arrives"""
+        conversation = Mock(id=uuid4(), agent_type="goal", messages=[], context_state={})
+        db = Mock()
+        db.get.return_value = conversation
+        request = ConversationRequest(
+            user_id=str(uuid4()),
+            session_id=str(uuid4()),
+            conversation_id=str(conversation.id),
+            message="hello",
+            target_persona_id=str(uuid4()),
+            agent_context={"force_agent_type": "goal"}
+        )
+        response = ConversationResponse(
+            conversation_id="test",
+            agent_type="goal",
+            user_response="Goal response",
+            database_changes={},
+            agent_transition={'occurred': False},
+            context_updates={}
+        )
+        
+        async def fake_stream(message, context):
+            yield "Goal "
+            yield "response"
+            yield response
+        
+        goal_agent = self.manager._get_agent('goal')
+        with patch.object(goal_agent, 'process_message_stream', fake_stream), \
+             patch.object(self.manager, '_save_conversation', AsyncMock()) as mock_save:
+            items = [item async for item in self.manager.process_message_stream(request, db)]
+        
+        assert items == ["Goal ", "response", response]
+        assert response.conversation_id == str(conversation.id)
+        assert response.intent == "forced_goal"
+        mock_save.assert_awaited_once_with(conversation, request, response, db)
+    
+    @pytest.mark.asyncio
+    async def test_bulk_personas_only_on_opt_in(self):
+        """Test the user's personas are loaded for bulk summaries only when the caller asks"""
+        db = Mock()
+        db.execute.return_value.all.return_value = [("Parent", "Raise confident kids"), ("Maker", "Build useful things")]
+        response = ConversationResponse(
+            conversation_id="test",
+            agent_type="management",
+            user_response="Parent: Present",
+            database_changes={},
+            agent_transition={'occurred': False},
+            context_updates={}
+        )
+        
+        management_agent = self.manager._get_agent('management')
+        contexts = []
+        for agent_context in ({}, {'bulk_personas': True}):
+            request = ConversationRequest(user_id=str(uuid4()), message="show me all my personas", agent_context=agent_context)
+            with patch.object(management_agent, 'process_message', AsyncMock(return_value=response)) as mock_process, \
+                 patch.object(self.manager, '_save_conversation', AsyncMock()):
+                await self.manager.process_message(request, db)
+            contexts.append(mock_process.call_args[0][1])
+        
+        assert 'bulk_personas' not in contexts[0]
+        assert contexts[1]['bulk_personas'] == [
+            {'name': 'Parent', 'north_star': 'Raise confident kids'},
+            {'name': 'Maker', 'north_star': 'Build useful things'}
+        ]
 
 class TestEducationalAgent:
     """Tests for EducationalAgent behavior"""
@@ -154,7 +386,7 @@ class TestEducationalAgent:
         assert "user (unknown): Hello" in prompt
         assert "agent (unknown): Hi there!" in prompt
     
-    @patch('openai.OpenAI')
+    @patch('openai.AsyncOpenAI')
     @pytest.mark.asyncio
     async def test_openai_call(self, mock_openai_class):
         """Test OpenAI API integration"""
@@ -165,13 +397,59 @@ class TestEducationalAgent:
         mock_response = Mock()
         mock_response.choices = [Mock()]
         mock_response.choices[0].message.content = "Educational response about personas"
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
         with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
             response = await self.agent.call_openai("System prompt", "What is a persona?")
             
             assert response == "Educational response about personas"
             mock_client.chat.completions.create.assert_called_once()
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_openai_client_reused(self, mock_openai_class):
+        """Test the OpenAI client is created once and reused across calls"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Response"
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            await self.agent.call_openai("System prompt", "First")
+            await self.agent.call_openai("System prompt", "Second")
+            
+            assert mock_openai_class.call_count == 1
+            assert mock_client.chat.completions.create.call_count == 2
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_repeated_question_uses_response_cache(self, mock_openai_class):
+        """Test identical prompt + question is answered from cache, unless it carries commands"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "A persona is a role you play"
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            first = await self.agent.call_openai("System prompt", "What is a persona?")
+            second = await self.agent.call_openai("System prompt", "  what is a PERSONA?")
+            
+            assert first == second == "A persona is a role you play"
+            assert mock_client.chat.completions.create.call_count == 1
+            
+            await self.agent.call_openai("System prompt", "What is a persona?", use_cache=False)
+            assert mock_client.chat.completions.create.call_count == 2
+            
+            mock_response.choices[0].message.content = "Great! TRANSITION_TO_DISCOVERY"
+            await self.agent.call_openai("System prompt", "Yes please")
+            await self.agent.call_openai("System prompt", "Yes please")
+            assert mock_client.chat.completions.create.call_count == 4
 
 
 class TestDiscoveryAgent:
@@ -195,6 +473,57 @@ class TestDiscoveryAgent:
         assert "PERSONA_CONFIRMED:" in prompt
         assert "persona creation" in prompt.lower()
         assert "discovery" in prompt.lower()
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_history_sent_after_static_prompt(self, mock_openai_class):
+        """Test history goes in its own message so the system prompt prefix stays constant"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Tell me about your roles"
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        context = {'conversation_history': [{'from': 'user', 'text': 'I am a parent'}]}
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            await self.agent.process_message("Help me find my personas", context)
+        
+        messages = mock_client.chat.completions.create.call_args.kwargs['messages']
+        assert messages[0] == {"role": "system", "content": DiscoveryAgent._SYSTEM_PROMPT_STATIC}
+        assert messages[1] == {"role": "system", "content": "user (unknown): I am a parent"}
+        assert messages[2] == {"role": "user", "content": "Help me find my personas"}
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_process_message_stream(self, mock_openai_class):
+        """Test streamed text hides command lines and ends with the parsed response"""
+        deltas = ["Lovely! ", "You sound like a mentor.\nPERSONA_", "CONFIRMED: Mentor | To help others grow\n", "Anything else?"]
+        
+        async def fake_chunks():
+            for delta in deltas:
+                chunk = Mock()
+                chunk.choices = [Mock()]
+                chunk.choices[0].delta.content = delta
+                yield chunk
+        
+        # Stand-in for openai.AsyncStream: async-iterable with an async close()
+        fake_stream = Mock(__aiter__=lambda self: fake_chunks(), close=AsyncMock())
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create = AsyncMock(return_value=fake_stream)
+        
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            items = [item async for item in self.agent.process_message_stream("I mentor juniors", {})]
+        
+        *chunks, response = items
+        assert "".join(chunks) == "Lovely! You sound like a mentor.\nAnything else?"
+        assert isinstance(response, ConversationResponse)
+        assert response.database_changes.personas_created[0]['name'] == 'Mentor'
+        assert mock_client.chat.completions.create.call_args.kwargs['stream'] is True
+        fake_stream.close.assert_awaited_once()
+
 
 
 class TestRefinementAgent:
@@ -236,6 +565,42 @@ class TestRefinementAgent:
         assert "Creative Professional" in prompt
         assert "authentic creativity" in prompt
         assert "REFINED_NORTHSTAR:" in prompt
+    
+    def test_static_prompt_prefix_independent_of_context(self):
+        """Test persona and history only appear in the context message after the static prompt"""
+        context = {
+            'target_persona_id': 'test-persona-id',
+            'target_persona': {'name': 'Creative Professional'},
+            'conversation_history': [{'from': 'user', 'text': 'Make it bolder'}]
+        }
+        
+        system_prompt, context_message = self.agent.build_prompt(context)
+        
+        assert system_prompt == self.agent.build_prompt({'conversation_history': []})[0]
+        assert "Creative Professional" in context_message
+        assert context_message.endswith("user: Make it bolder")
+        assert self.agent.build_prompt({'target_persona_id': 'test-persona-id', 'conversation_history': []})[1] == \
+            "TARGET PERSONA CONTEXT:\nTarget Persona ID: test-persona-id"
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_uses_short_reply_budget(self, mock_openai_class):
+        """Test refinement requests are sent with the agent's smaller max_tokens"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "What would make it bolder?"
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        context = {'target_persona_id': 'test-persona-id', 'conversation_history': []}
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            await self.agent.process_message("improve my persona", context)
+        
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert kwargs['model'] == "gpt-4o-mini"
+        assert kwargs['max_tokens'] == 400
 
 
 class TestGoalAgent:
@@ -260,8 +625,8 @@ class TestGoalAgent:
         assert "which persona" in response.user_response.lower()
         assert response.agent_type == "goal"
     
-    def test_system_prompt_includes_goal_commands(self):
-        """Test system prompt includes GOAL_CREATED command"""
+    def test_system_prompt_describes_structured_reply(self):
+        """Test system prompt asks for the JSON reply/goals format"""
         context = {
             'target_persona_id': 'test-id',
             'conversation_history': []
@@ -269,8 +634,34 @@ class TestGoalAgent:
         
         prompt = self.agent.generate_system_prompt(context)
         
-        assert "GOAL_CREATED:" in prompt
+        assert '"reply"' in prompt and '"goals"' in prompt
         assert "SMART goals" in prompt
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_structured_reply_creates_goals(self, mock_openai_class):
+        """Test goals come from the structured output and goal-creating replies aren't cached"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = (
+            '{"reply": "Here are your goals!", "goals": '
+            '[{"name": "Write daily", "acceptance_criteria": "1000 words", "review_date": "2024-01-15"}]}'
+        )
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        context = {'target_persona_id': 'test-id', 'conversation_history': []}
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            response = await self.agent.process_message("set goals", context)
+            await self.agent.process_message("set goals", context)
+        
+        assert response.user_response == "Here are your goals!"
+        assert response.database_changes.goals_created[0]['name'] == "Write daily"
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert kwargs['response_format']['type'] == "json_schema"
+        assert mock_client.chat.completions.create.call_count == 2
 
 
 class TestManagementAgent:
@@ -300,6 +691,48 @@ class TestManagementAgent:
         assert "TRANSITION_TO_" in prompt
         assert "2 personas" in prompt
         assert "3 active goals" in prompt
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_bulk_personas_single_request(self, mock_openai_class):
+        """Test bulk persona summaries are fetched in one JSON-mode request"""
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = '{"summaries": ["Present and patient", "Shipping weekly"]}'
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        context = {'bulk_personas': [
+            {'name': 'Parent', 'north_star': 'Raise confident kids'},
+            {'name': 'Maker', 'north_star': 'Build useful things'},
+            {'name': 'Runner', 'north_star': 'Finish a marathon'}
+        ]}
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            response = await self.agent.process_message("How are my personas doing?", context)
+        
+        mock_client.chat.completions.create.assert_called_once()
+        assert mock_client.chat.completions.create.call_args.kwargs['response_format'] == {"type": "json_object"}
+        assert response.context_updates.temporary_state['persona_summaries'] == [
+            {'persona': 'Parent', 'summary': 'Present and patient'},
+            {'persona': 'Maker', 'summary': 'Shipping weekly'},
+            {'persona': 'Runner', 'summary': ''}
+        ]
+        assert "Parent: Present and patient" in response.user_response
+    
+    @pytest.mark.asyncio
+    async def test_bulk_personas_stream_matches_process_message(self):
+        """Test the streaming path answers bulk_personas with the same bulk summary"""
+        context = {'bulk_personas': [{'name': 'Parent', 'north_star': 'Raise confident kids'}]}
+        with patch.object(self.agent, 'summarize_personas', AsyncMock(return_value=["Present and patient"])):
+            items = [item async for item in self.agent.process_message_stream("How are my personas doing?", context)]
+        
+        assert items[0] == "Parent: Present and patient"
+        assert items[-1].context_updates.temporary_state['persona_summaries'] == [
+            {'persona': 'Parent', 'summary': 'Present and patient'}
+        ]
+
 
 
 class TestBaseAgentUtilities:
@@ -320,6 +753,16 @@ class TestBaseAgentUtilities:
         assert actions[0]['name'] == 'Creative Professional'
         assert 'authentic creativity' in actions[0]['north_star']
     
+    def test_extract_refined_northstar_first_only(self):
+        """Test only the first REFINED_NORTHSTAR in a response is used"""
+        response = "REFINED_NORTHSTAR: To inspire others\nREFINED_NORTHSTAR: Something else"
+        
+        actions = self.agent.extract_persona_actions(response)
+        
+        assert actions == [{'type': 'update_northstar', 'north_star': 'To inspire others'}]
+        assert self.agent._single_pass_parse(response)[1] == actions
+        assert self.agent.clean_response_for_user(response) == ""
+    
     def test_extract_transitions(self):
         """Test transition extraction"""
         response_with_transition = "Let's move to discovery: TRANSITION_TO_DISCOVERY"
@@ -340,6 +783,330 @@ class TestBaseAgentUtilities:
         assert "TRANSITION_TO_DISCOVERY:" not in cleaned
         assert "Here's info" in cleaned
         assert "more text" in cleaned
+    
+    def test_single_pass_parse_matches_extractors(self):
+        """Test the single-pass parser agrees with the per-command extractors"""
+        well_formed = [
+            "Here's info PERSONA_CONFIRMED: Test | Northstar\nTRANSITION_TO_DISCOVERY: next\nmore text",
+            "PERSONA_CONFIRMED: Mentor | Help others grow\nREFINED_NORTHSTAR: Lift others up",
+            "GOAL_CREATED: Write daily | 1000 words | 2024-01-15\nTRANSITION_TO_MANAGEMENT: goals set",
+            "Great! TRANSITION_TO_DISCOVERY",
+            # Value on the line after the colon
+            "TRANSITION_TO_GOALS:\nParent",
+            "Ok TRANSITION_TO_REFINEMENT:\npersona-123\nbye",
+            "PERSONA_CONFIRMED:\nMentor | Help others grow",
+            "No commands here at all."
+        ]
+        for response in well_formed:
+            assert self.agent._single_pass_parse(response) == (
+                self.agent.clean_response_for_user(response),
+                self.agent.extract_persona_actions(response),
+                self.agent.extract_goal_actions(response),
+                self.agent.extract_transitions(response)
+            )
+        
+        # A malformed command must not swallow the valid command on the next line
+        malformed = [
+            ("PERSONA_CONFIRMED: Mentor | Help others grow\nPERSONA_CONFIRMED: Parent\nGOAL_CREATED: Write | 1000 words | 2024-01-15",
+             "GOAL_CREATED:"),
+            ("REFINED_NORTHSTAR:\nTRANSITION_TO_REFINEMENT: persona-123", "TRANSITION_TO_REFINEMENT:")
+        ]
+        for response, valid_command in malformed:
+            cleaned, _, goal_actions, transition = self.agent._single_pass_parse(response)
+            assert goal_actions == self.agent.extract_goal_actions(response)
+            assert transition == self.agent.extract_transitions(response)
+            assert valid_command not in cleaned
+        
+    
+    def test_normalize_history_columns(self):
+        """Test history is split into columns with legacy key fallbacks resolved"""
+        from agents.base import normalize_history
+        
+        froms, texts, agent_types = normalize_history([
+            {'from': 'user', 'text': 'Hello', 'agent_type': 'educational'},
+            {'from_user': 'agent', 'message': 'Hi there!'},
+            {}
+        ])
+        
+        assert froms == ['user', 'agent', 'unknown']
+        assert texts == ['Hello', 'Hi there!', '']
+        assert agent_types == ['educational', 'unknown', 'unknown']
+    
+    def test_render_session_history_cached(self):
+        """Test history rendering is cached until a new message arrives"""
+        context = {'session_history': [
+            {'id': 'msg-1', 'from': 'user', 'text': 'Hello', 'agent_type': 'educational'}
+        ]}
+        
+        assert self.agent.render_session_history(context) == "user (educational): Hello"
+        assert self.agent.render_session_history(context) is self.agent.render_session_history(context)
+        
+        context['session_history'].append({'id': 'msg-2', 'from_user': 'agent', 'message': 'Hi there!'})
+        assert self.agent.render_session_history(context) == "user (educational): Hello\nagent (unknown): Hi there!"
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_history_windowed_with_summary(self, mock_openai_class):
+        """Test only the last HISTORY_WINDOW messages are rendered, after the running summary"""
+        from agents.base import HISTORY_WINDOW, HISTORY_SUMMARY_INTERVAL
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "User explored a Mentor persona."
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        history = [{'id': f'msg-{i}', 'from': 'user', 'text': f'turn {i}'} for i in range(HISTORY_SUMMARY_INTERVAL)]
+        context = {'conversation_history': history}
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            context['history_summary'] = await self.agent.summarize_history(context)
+            assert await self.agent.summarize_history({'conversation_history': history[:-2]}) is None
+        
+        lines = self.agent.render_conversation_history(context).split("\n")
+        assert lines[0] == "Summary of earlier conversation: User explored a Mentor persona."
+        assert lines[1:] == [f"user: turn {i}" for i in range(HISTORY_SUMMARY_INTERVAL - HISTORY_WINDOW, HISTORY_SUMMARY_INTERVAL)]
+        transcript = mock_client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+        assert "turn 0" in transcript and f"turn {HISTORY_SUMMARY_INTERVAL - HISTORY_WINDOW}" not in transcript
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_history_summary_catches_up_after_failed_refresh(self, mock_openai_class):
+        """Test a refresh summarizes everything since the last successful one, not just the last interval"""
+        from agents.base import HISTORY_WINDOW, HISTORY_SUMMARY_INTERVAL
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Caught up."
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        
+        # Last refreshed at one interval; the refresh at two intervals failed
+        summarized_at = HISTORY_SUMMARY_INTERVAL
+        total = 3 * HISTORY_SUMMARY_INTERVAL - 2
+        history = [{'id': f'msg-{i}', 'from': 'user', 'text': f'turn {i}'} for i in range(total)]
+        context = {'conversation_history': history, 'history_summary': "Earlier.", 'history_summary_at': summarized_at}
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            assert await self.agent.summarize_history(context) == "Caught up."
+        
+        transcript = mock_client.chat.completions.create.call_args.kwargs['messages'][1]['content']
+        lines = transcript.split("\n")
+        assert lines[0] == "Summary so far: Earlier."
+        assert lines[2:] == [f"user: turn {i}" for i in range(summarized_at - HISTORY_WINDOW, total - HISTORY_WINDOW)]
+
+
+class TestIntentRules:
+    """Tests for compiled intent phrase rules"""
+    
+    def test_rule_order_wins_over_phrase_position(self):
+        """Test the earliest rule wins even if another rule's phrase appears first"""
+        agent = DiscoveryAgent()
+        
+        assert agent.analyze_message_for_intent("Help me find my personas") == "persona_creation"
+        assert agent.analyze_message_for_intent("Help me find my way") == "identity_clarification"
+        assert agent.analyze_message_for_intent("Hello") == "persona_discovery"
+    
+    def test_all_phrase_groups_required(self):
+        """Test a rule with several phrase groups needs a match from each"""
+        from agents.intents import IntentRules
+        rules = IntentRules([("persona_education", ("persona",), ("what", "explain"))])
+        
+        assert rules.classify("What is a PERSONA?", default="other") == "persona_education"
+        assert rules.classify("persona", default="other") == "other"
+    
+    def test_overlapping_phrases_all_found(self):
+        """Test phrases that overlap or share a prefix are all seen in one scan"""
+        from agents.intents import IntentRules
+        rules = IntentRules([
+            ("goal_setting", ("goal",), ("goals for",)),
+            ("planning", ("set goals",), ("for my",)),
+        ])
+        
+        assert rules.classify("Set goals for my persona", default="other") == "goal_setting"
+        assert rules.classify("set goals for my team", default="other") == "goal_setting"
+        assert rules.classify("Set goals, for my sake", default="other") == "planning"
+
+
+class TestOpenAIClient:
+    """Tests for the shared OpenAI client helpers"""
+    
+    @pytest.mark.asyncio
+    async def test_stream_holds_concurrency_slot(self):
+        """Test a streamed completion keeps its concurrency slot until the stream is closed"""
+        from agents.openai_client import MAX_CONCURRENCY, _get_semaphore, stream_chat_completion
+        
+        stream = Mock(close=AsyncMock())
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(return_value=stream)
+        semaphore = _get_semaphore()
+        
+        async with stream_chat_completion(mock_client, model="gpt-4o-mini", messages=[]) as opened:
+            assert opened is stream
+            assert semaphore._value == MAX_CONCURRENCY - 1
+        
+        assert semaphore._value == MAX_CONCURRENCY
+        stream.close.assert_awaited_once()
+        assert mock_client.chat.completions.create.call_args.kwargs['stream'] is True
+    
+    @pytest.mark.asyncio
+    async def test_retries_rate_limit_with_backoff(self):
+        """Test rate-limited calls are retried with exponential backoff"""
+        import httpx
+        import openai
+        from agents.openai_client import create_chat_completion
+        
+        rate_limited = openai.RateLimitError(
+            "Rate limit reached",
+            response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")),
+            body=None
+        )
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=[rate_limited, rate_limited, "completion"])
+        
+        with patch('agents.openai_client.asyncio.sleep', new_callable=AsyncMock) as mock_sleep, \
+             patch('agents.openai_client.random.uniform', return_value=0.5):
+            result = await create_chat_completion(mock_client, model="gpt-4o-mini", messages=[])
+        
+        assert result == "completion"
+        assert mock_client.chat.completions.create.call_count == 3
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [1.5, 2.5]
+    
+    @pytest.mark.asyncio
+    async def test_bad_request_not_retried(self):
+        """Test permanent errors propagate on the first attempt"""
+        import httpx
+        import openai
+        from agents.openai_client import create_chat_completion
+        
+        bad_request = openai.BadRequestError(
+            "Invalid request",
+            response=httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")),
+            body=None
+        )
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(side_effect=bad_request)
+        
+        with patch('agents.openai_client.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            with pytest.raises(openai.BadRequestError):
+                await create_chat_completion(mock_client, model="gpt-4o-mini", messages=[])
+        
+        assert mock_client.chat.completions.create.call_count == 1
+        mock_sleep.assert_not_called()
+
+
+class TestBatchProcessing:
+    """Tests for Batch API submission and collection"""
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_process_message_batched_submits_jsonl(self, mock_openai_class):
+        """Test batched messages are uploaded as JSONL chat-completion requests"""
+        import json
+        
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.files.create = AsyncMock(return_value=Mock(id="file-123"))
+        mock_client.batches.create = AsyncMock(return_value=Mock(id="batch-456"))
+        
+        agent = ManagementAgent()
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            batch_id = await agent.process_message_batched([
+                {'custom_id': 'user-1', 'message': 'Review my progress', 'context': {'user_goals': [1, 2]}},
+                {'custom_id': 'user-2', 'message': 'Give me an overview', 'context': {}}
+            ])
+        
+        assert batch_id == "batch-456"
+        _, jsonl = mock_client.files.create.call_args.kwargs['file']
+        lines = [json.loads(line) for line in jsonl.decode().splitlines()]
+        assert [line['custom_id'] for line in lines] == ['user-1', 'user-2']
+        assert lines[0]['url'] == "/v1/chat/completions"
+        assert "2 active goals" in lines[0]['body']['messages'][0]['content']
+        assert mock_client.batches.create.call_args.kwargs['input_file_id'] == "file-123"
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_get_batch_results(self, mock_openai_class):
+        """Test completed batch output is mapped back by custom_id"""
+        import json
+        from agents.batch import get_batch_results
+        
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        output = "\n".join([
+            json.dumps({'custom_id': 'user-1', 'response': {'status_code': 200, 'body': {
+                'choices': [{'message': {'content': 'You are doing well'}}]}}}),
+            json.dumps({'custom_id': 'user-2', 'response': {'status_code': 500, 'body': {}}})
+        ])
+        mock_client.batches.retrieve = AsyncMock(side_effect=[
+            Mock(status="in_progress"),
+            Mock(status="completed", output_file_id="file-out", error_file_id=None)
+        ])
+        mock_client.files.content = AsyncMock(return_value=Mock(text=output))
+        
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            assert await get_batch_results("batch-456") is None
+            results = await get_batch_results("batch-456")
+        
+        assert results == {'user-1': 'You are doing well', 'user-2': None}
+    
+    @patch('openai.AsyncOpenAI')
+    @pytest.mark.asyncio
+    async def test_get_batch_results_failed_batch(self, mock_openai_class):
+        """Test a batch that will never complete raises instead of reading as pending"""
+        from agents.batch import BatchFailedError, get_batch_results
+        
+        mock_client = Mock()
+        mock_openai_class.return_value = mock_client
+        mock_client.batches.retrieve = AsyncMock(return_value=Mock(status="expired"))
+        
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
+            with pytest.raises(BatchFailedError) as excinfo:
+                await get_batch_results("batch-456")
+        
+        assert excinfo.value.status == "expired"
+    
+    def test_progress_review_collect_exit_codes(self):
+        """Test collect exits non-zero, distinctly, for pending and failed batches"""
+        import progress_review_batch
+        from agents.batch import BatchFailedError
+        
+        with patch('progress_review_batch.SessionLocal'):
+            with patch('progress_review_batch.get_batch_results', AsyncMock(return_value=None)):
+                assert progress_review_batch.main(['progress_review_batch.py', 'collect', 'batch-456']) == 1
+            with patch('progress_review_batch.get_batch_results', AsyncMock(side_effect=BatchFailedError("batch-456", "failed"))):
+                assert progress_review_batch.main(['progress_review_batch.py', 'collect', 'batch-456']) == 3
+    
+    @pytest.mark.asyncio
+    async def test_progress_review_job(self):
+        """Test the progress review job queues one request per user and stores the finished reviews"""
+        from progress_review_batch import submit_progress_reviews, collect_progress_reviews
+        user_id = uuid4()
+        db = Mock()
+        db.execute.side_effect = [
+            [(user_id, "Parent", "Raise confident kids"), (user_id, "Maker", "Build useful things")],
+            [(user_id, "Read bedtime stories")]
+        ]
+        
+        with patch.object(ManagementAgent, 'process_message_batched', AsyncMock(return_value="batch-456")) as mock_batched:
+            assert await submit_progress_reviews(db) == "batch-456"
+        
+        (item,), = mock_batched.call_args[0]
+        assert item['custom_id'] == str(user_id)
+        assert len(item['context']['user_personas']) == 2
+        assert item['context']['user_goals'] == [{'name': "Read bedtime stories"}]
+        
+        db = Mock()
+        results = {str(user_id): "Parent is on track.\nTRANSITION_TO_REFINEMENT: persona-1", str(uuid4()): None}
+        with patch('progress_review_batch.get_batch_results', AsyncMock(side_effect=[None, results])):
+            assert await collect_progress_reviews(db, "batch-456") is None
+            assert await collect_progress_reviews(db, "batch-456") == 1
+        
+        rows = db.execute.call_args[0][1]
+        assert rows[0]['user_id'] == user_id
+        assert rows[0]['agent_type'] == "management"
+        assert rows[0]['messages'][0]['text'] == "Parent is on track."
+        db.commit.assert_called_once()
 
 
 class TestIntegrationScenarios:
@@ -366,6 +1133,23 @@ class TestIntegrationScenarios:
             assert agent_type in self.manager.agents
             assert self.manager.agents[agent_type].agent_type == agent_type
     
+    def test_agents_created_on_first_use(self):
+        """Test agents are only instantiated when first requested, then reused"""
+        manager = ConversationManager()
+        assert manager._agent_instances == {}
+        
+        agent = manager._get_agent('goal')
+        assert agent.agent_type == 'goal'
+        assert list(manager._agent_instances) == ['goal']
+        assert manager._get_agent('goal') is agent
+        assert manager.agents['goal'] is agent
+    
+    def test_conversation_manager_shared(self):
+        """Test get_conversation_manager returns one process-wide instance"""
+        manager = get_conversation_manager()
+        assert isinstance(manager, ConversationManager)
+        assert get_conversation_manager() is manager
+    
     def test_intent_to_agent_mapping_complete(self):
         """Test all intents have corresponding agent mappings"""
         # Test a sampling of intents to ensure routing works
@@ -203,6 +203,34 @@ class TestPersonaEndpoints:
         data = response.json()
         assert "Persona not found" in data["detail"]
 
+class TestConversationListEndpoints:
+    """Test conversation list API endpoints"""
+    
+    def test_cursor_pages_keep_total_count(self, client, created_user):
+        """Test cursor pages cover every conversation once and all report the full total"""
+        for topic in ("First", "Second", "Third"):
+            client.post("/conversations/", json={
+                "user_id": str(created_user.id),
+                "conversation_type": "discovery",
+                "topic": topic
+            })
+        
+        first = client.get(f"/users/{created_user.id}/conversations", params={"limit": 2}).json()
+        second = client.get(
+            f"/users/{created_user.id}/conversations",
+            params={"limit": 2, "cursor": first["next_cursor"]}
+        ).json()
+        
+        assert first["total_count"] == second["total_count"] == 3
+        assert second["next_cursor"] is None
+        topics = [conversation["topic"] for conversation in first["conversations"] + second["conversations"]]
+        assert sorted(topics) == ["First", "Second", "Third"]
+    
+    def test_invalid_cursor(self, client, created_user):
+        """Test a malformed cursor is rejected"""
+        response = client.get(f"/users/{created_user.id}/conversations", params={"cursor": "not-a-cursor"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 class TestAPIErrorHandling:
     """Test API error handling and edge cases"""
     
@@ -25,7 +25,7 @@ class TestConversationEndpointIntegration:
         assert response.status_code == 422
     
     @patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})
-    @patch('openai.OpenAI')
+    @patch('openai.AsyncOpenAI')
     def test_educational_agent_conversation(self, mock_openai_class, client, test_db):
         """Test complete conversation flow with educational agent"""
         # Set up OpenAI mock
@@ -37,7 +37,7 @@ class TestConversationEndpointIntegration:
         mock_response.choices[0].message.content = """A persona represents a different aspect or role in your life - like being a parent, professional, or creative individual. Each persona has its own northstar (guiding aspiration) that helps you focus your growth in that area.
 
 Would you like to discover your own personas? I can help you identify the key roles and aspirations in your life."""
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
         # Create test user first
         test_user = User(
@@ -68,7 +68,7 @@ Would you like to discover your own personas? I can help you identify the key ro
         assert response_data["intent_confidence"] > 0.5
     
     @patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'})  
-    @patch('openai.OpenAI')
+    @patch('openai.AsyncOpenAI')
     def test_forced_agent_routing(self, mock_openai_class, client, test_db):
         """Test forcing specific agent bypasses intent analysis"""
         # Set up OpenAI mock
@@ -78,7 +78,7 @@ Would you like to discover your own personas? I can help you identify the key ro
         mock_response = Mock()
         mock_response.choices = [Mock()]
         mock_response.choices[0].message.content = "I'd be happy to help you manage your personas and goals strategically. Let me provide an overview of your current development portfolio."
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
         # Create test user
         test_user = User(
@@ -127,7 +127,7 @@ Would you like to discover your own personas? I can help you identify the key ro
         
         for message, expected_agent in test_cases:
             with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
-                with patch('openai.OpenAI') as mock_openai_class:
+                with patch('openai.AsyncOpenAI') as mock_openai_class:
                     # Mock OpenAI response
                     mock_client = Mock()
                     mock_openai_class.return_value = mock_client
@@ -135,7 +135,7 @@ Would you like to discover your own personas? I can help you identify the key ro
                     mock_response = Mock()
                     mock_response.choices = [Mock()]
                     mock_response.choices[0].message.content = f"Response from {expected_agent} agent"
-                    mock_client.chat.completions.create.return_value = mock_response
+                    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
                     
                     request_data = {
                         "user_id": str(test_user.id),
@@ -160,7 +160,7 @@ Would you like to discover your own personas? I can help you identify the key ro
         test_db.refresh(test_user)
         
         with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
-            with patch('openai.OpenAI') as mock_openai_class:
+            with patch('openai.AsyncOpenAI') as mock_openai_class:
                 # Mock OpenAI response
                 mock_client = Mock()
                 mock_openai_class.return_value = mock_client
@@ -168,7 +168,7 @@ Would you like to discover your own personas? I can help you identify the key ro
                 mock_response = Mock()
                 mock_response.choices = [Mock()]
                 mock_response.choices[0].message.content = "Educational response"
-                mock_client.chat.completions.create.return_value = mock_response
+                mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
                 
                 session_id = str(uuid4())
                 request_data = {
@@ -230,7 +230,7 @@ Would you like to discover your own personas? I can help you identify the key ro
         test_db.commit()
         
         with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
-            with patch('openai.OpenAI') as mock_openai_class:
+            with patch('openai.AsyncOpenAI') as mock_openai_class:
                 # Mock OpenAI response
                 mock_client = Mock()
                 mock_openai_class.return_value = mock_client
@@ -238,7 +238,7 @@ Would you like to discover your own personas? I can help you identify the key ro
                 mock_response = Mock()
                 mock_response.choices = [Mock()]
                 mock_response.choices[0].message.content = "Follow-up educational response"
-                mock_client.chat.completions.create.return_value = mock_response
+                mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
                 
                 # Continue conversation
                 request_data = {
@@ -288,11 +288,11 @@ Would you like to discover your own personas? I can help you identify the key ro
         test_db.refresh(test_user)
         
         with patch.dict('os.environ', {'OPENAI_API_KEY': 'test-key'}):
-            with patch('openai.OpenAI') as mock_openai_class:
+            with patch('openai.AsyncOpenAI') as mock_openai_class:
                 # Mock OpenAI client that raises an exception
                 mock_client = Mock()
                 mock_openai_class.return_value = mock_client
-                mock_client.chat.completions.create.side_effect = Exception("OpenAI API Error")
+                mock_client.chat.completions.create = AsyncMock(side_effect=Exception("OpenAI API Error"))
                 
                 request_data = {
                     "user_id": str(test_user.id),
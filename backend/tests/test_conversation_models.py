@@ -12,7 +12,9 @@ from conversation_models import (
     DatabaseChanges,
     ContextUpdates,
     PersonaAction,
-    GoalAction
+    GoalAction,
+    ConversationMessage,
+    ConversationHistory
 )
 
 
@@ -140,6 +142,23 @@ class TestConversationResponse:
         assert response.context_updates.current_agent_type == "educational"
         assert response.intent == "concept_explanation"
         assert response.intent_confidence == 0.95
+    
+    def test_unknown_agent_type_rejected(self):
+        """Test agent types are limited to the registered agents"""
+        with pytest.raises(ValidationError):
+            ConversationResponse(conversation_id="a", agent_type="unknown", user_response="hi")
+        with pytest.raises(ValidationError):
+            AgentTransition(occurred=True, to_agent="unknown")
+    
+    def test_default_transition_not_shared(self):
+        """Test each response gets its own copy of the default transition"""
+        first = ConversationResponse(conversation_id="a", agent_type="educational", user_response="one")
+        second = ConversationResponse(conversation_id="b", agent_type="educational", user_response="two")
+        
+        first.agent_transition.occurred = True
+        
+        assert second.agent_transition.occurred == False
+        assert ConversationResponse(conversation_id="c", agent_type="goal", user_response="").agent_transition.occurred == False
 
 
 
@@ -241,6 +260,31 @@ class TestContextUpdates:
         assert updates.intent_confidence == 0.95
 
 
+class TestConversationHistory:
+    """Tests for ConversationHistory and ConversationMessage"""
+    
+    def test_messages_are_immutable(self):
+        """Test messages are frozen, slotted dataclasses"""
+        message = ConversationMessage(id="m1", from_user="user", text="Hi", timestamp=datetime(2024, 1, 15), agent_type="educational")
+        
+        with pytest.raises(AttributeError):
+            message.text = "changed"
+        assert not hasattr(message, '__dict__')
+    
+    def test_history_accepts_messages_and_dicts(self):
+        """Test history validates message dicts and serializes messages to JSON"""
+        history = ConversationHistory(
+            conversation_id=str(uuid4()),
+            messages=[
+                ConversationMessage(id="m1", from_user="user", text="Hi", timestamp=datetime(2024, 1, 15), agent_type="educational"),
+                {"id": "m2", "from_user": "agent", "text": "Hello", "timestamp": "2024-01-15T00:00:00", "agent_type": "educational"}
+            ],
+            total_messages=2
+        )
+        
+        assert history.messages[1] == ConversationMessage(id="m2", from_user="agent", text="Hello", timestamp=datetime(2024, 1, 15), agent_type="educational")
+        assert '"text":"Hello"' in history.model_dump_json()
+
 class TestModelInteroperability:
     """Tests for how models work together"""
     
@@ -37,6 +37,10 @@ export interface BackendConversation {
   ended_at?: string
 }
 
+// Conversation as returned by the list and search endpoints - messages are left out,
+// load them with the conversation by id
+export type BackendConversationSummary = Omit<BackendConversation, 'messages'>
+
 export interface CreatePersonaRequest {
   user_id: string
   label: string
@@ -285,7 +289,7 @@ class ApiClient {
       limit?: number
       offset?: number
     } = {}
-  ): Promise<{ conversations: BackendConversation[], total_count: number }> {
+  ): Promise<{ conversations: BackendConversationSummary[], total_count: number }> {
     const params = new URLSearchParams()
     
     if (options.conversation_type) params.append('conversation_type', options.conversation_type)
@@ -296,23 +300,23 @@ class ApiClient {
     const queryString = params.toString()
     const url = queryString ? `/users/${userId}/conversations?${queryString}` : `/users/${userId}/conversations`
     
-    return this.request<{ conversations: BackendConversation[], total_count: number }>(url)
+    return this.request<{ conversations: BackendConversationSummary[], total_count: number }>(url)
   }
 
   /**
    * Get discovery conversations for a user (shorthand)
    */
-  async getDiscoveryConversations(userId: string, limit?: number): Promise<{ conversations: BackendConversation[] }> {
+  async getDiscoveryConversations(userId: string, limit?: number): Promise<{ conversations: BackendConversationSummary[] }> {
     const params = limit ? `?limit=${limit}` : ''
-    return this.request<{ conversations: BackendConversation[] }>(`/users/${userId}/conversations/discovery${params}`)
+    return this.request<{ conversations: BackendConversationSummary[] }>(`/users/${userId}/conversations/discovery${params}`)
   }
 
   /**
    * Get conversations that discuss a specific persona
    */
-  async getConversationsByPersona(userId: string, personaName: string, limit?: number): Promise<{ conversations: BackendConversation[] }> {
+  async getConversationsByPersona(userId: string, personaName: string, limit?: number): Promise<{ conversations: BackendConversationSummary[] }> {
     const params = limit ? `?limit=${limit}` : ''
-    return this.request<{ conversations: BackendConversation[] }>(`/users/${userId}/conversations/by-persona/${encodeURIComponent(personaName)}${params}`)
+    return this.request<{ conversations: BackendConversationSummary[] }>(`/users/${userId}/conversations/by-persona/${encodeURIComponent(personaName)}${params}`)
   }
 
   /**
@@ -323,12 +327,12 @@ class ApiClient {
     query: string,
     conversationType?: string,
     limit?: number
-  ): Promise<{ conversations: BackendConversation[], search_query: string, total_results: number }> {
+  ): Promise<{ conversations: BackendConversationSummary[], search_query: string, total_results: number }> {
     const params = new URLSearchParams({ q: query })
     if (conversationType) params.append('conversation_type', conversationType)
     if (limit) params.append('limit', limit.toString())
     
-    return this.request<{ conversations: BackendConversation[], search_query: string, total_results: number }>(
+    return this.request<{ conversations: BackendConversationSummary[], search_query: string, total_results: number }>(
       `/users/${userId}/conversations/search?${params.toString()}`
     )
   }
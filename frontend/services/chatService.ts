@@ -38,6 +38,10 @@ export interface BackendConversation {
   ended_at?: string
 }
 
+// Conversation as returned by the list and search endpoints - messages are left out,
+// load them with the conversation by id
+export type BackendConversationSummary = Omit<BackendConversation, 'messages'>
+
 /**
  * Enhanced ChatService with user-centric conversation persistence
  * 
@@ -110,11 +114,20 @@ export class ChatService {
       const conversations = data.conversations || data // Handle both formats
       
       if (conversations && conversations.length > 0) {
-        const conversation = conversations[0]
+        // The list leaves messages out, so load the latest conversation itself
+        const conversationResponse = await fetch(
+          `${this.backendUrl}/conversations/${conversations[0].id}`
+        )
+        
+        if (!conversationResponse.ok) {
+          throw new Error(`HTTP ${conversationResponse.status}`)
+        }
+        
+        const conversation: BackendConversation = await conversationResponse.json()
         this.currentConversationId = conversation.id
         
         // Convert backend messages to frontend format
-        this.messages = conversation.messages.map((msg: any) => ({
+        this.messages = (conversation.messages || []).map((msg: any) => ({
           id: `${msg.sequence}`,
           from: msg.from === 'user' ? 'user' : 'coach',
           text: msg.text,
@@ -274,7 +287,7 @@ export class ChatService {
     type?: 'discovery' | 'refinement' | 'decision_making',
     tag?: string,
     limit?: number
-  ): Promise<BackendConversation[]> {
+  ): Promise<BackendConversationSummary[]> {
     if (!this.userId) return []
 
     try {
@@ -302,7 +315,7 @@ export class ChatService {
   /**
    * Get conversations that discuss a specific persona
    */
-  async getPersonaConversations(personaName: string): Promise<BackendConversation[]> {
+  async getPersonaConversations(personaName: string): Promise<BackendConversationSummary[]> {
     return this.getConversations(undefined, personaName)
   }
 
@@ -312,7 +325,7 @@ export class ChatService {
   async searchConversations(
     query: string,
     type?: 'discovery' | 'refinement' | 'decision_making'
-  ): Promise<BackendConversation[]> {
+  ): Promise<BackendConversationSummary[]> {
     if (!this.userId) return []
 
     try {